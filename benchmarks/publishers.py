@@ -0,0 +1,353 @@
+# publishers.py
+"""
+Local publisher simulator for the benchmarks.
+
+One ThreadingHTTPServer on 127.0.0.1 serves every simulated site; the site is
+picked from the Host header, e.g. `wordpress-3.bench.test` or
+`news.wordpress-3.bench.test`. Content is deterministic per host so runs are
+comparable.
+
+Profiles:
+- wordpress:   big nav (hundreds of category links), /feed/, category feeds,
+               wp-sitemap.xml index, gzip-encoded homepage
+- bigsitemap:  robots.txt points at a 50k-URL gzipped sitemap
+- sitemapindex: sitemap index with hundreds of dated children plus a news sitemap
+- slow:        every response is delayed
+- throttled:   first hit on each path answers 429 with Retry-After
+               (until GET /__reset, which the runner sends before every run)
+- redirect:    bare host redirects to www., feed paths redirect to one feed
+"""
+import gzip
+import hashlib
+import multiprocessing
+import re
+import threading
+import time
+import urllib.request
+from email.utils import formatdate
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROFILES = ("wordpress", "bigsitemap", "sitemapindex", "slow", "throttled", "redirect")
+SUFFIX = "bench.test"
+HOST_RE = re.compile(r"(?:^|\.)(?P<site>(?P<profile>[a-z]+)-\d+\." + re.escape(SUFFIX) + r")$")
+
+NAV_CATEGORIES = 400
+BIG_SITEMAP_URLS = 50000
+INDEX_CHILDREN = 240
+CHILD_URLS = 1000
+SLOW_DELAY = 0.3
+RETRY_AFTER = 1
+RESET_PATH = "/__reset"
+# Fixed epoch so generated dates never depend on when the benchmark runs
+EPOCH = 1767225600  # 2026-01-01T00:00:00Z
+
+
+def make_domains(count, profiles=PROFILES):
+    """`count` domains, cycling through the profiles."""
+    return [f"{profiles[i % len(profiles)]}-{i // len(profiles)}.{SUFFIX}" for i in range(count)]
+
+
+def site_of(host):
+    """(registered site, profile) for a simulated host, or (None, None)."""
+    match = HOST_RE.search(host.split(":")[0].lower())
+    if not match:
+        return None, None
+    return match.group("site"), match.group("profile")
+
+
+# -------------------------------
+# Documents
+# -------------------------------
+def rss(host, path, items=20):
+    entries = "".join(
+        f"<item><title>Story {i}</title><link>https://{host}{path.rstrip('/')}/story-{i}</link>"
+        f"<pubDate>{formatdate(EPOCH - i * 3600, usegmt=True)}</pubDate></item>"
+        for i in range(items)
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{host}</title><link>https://{host}/</link>{entries}</channel></rss>"
+    ).encode()
+
+
+def atom(host, items=20):
+    entries = "".join(
+        f'<entry><title>Post {i}</title><link href="https://{host}/post-{i}"/>'
+        f"<updated>{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(EPOCH - i * 3600))}</updated></entry>"
+        for i in range(items)
+    )
+    return (
+        f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>{host}</title>{entries}</feed>"
+    ).encode()
+
+
+def urlset(host, count, prefix="article", news=False):
+    ns = ' xmlns:news="http://www.google.com/schemas/sitemap-news/0.9"' if news else ""
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"{ns}>']
+    for i in range(count):
+        lastmod = time.strftime("%Y-%m-%d", time.gmtime(EPOCH - i * 600))
+        extra = f"<news:news><news:title>Story {i}</news:title></news:news>" if news else ""
+        parts.append(f"<url><loc>https://{host}/{prefix}/{i}</loc><lastmod>{lastmod}</lastmod>{extra}</url>")
+    parts.append("</urlset>")
+    return "".join(parts).encode()
+
+
+def sitemap_index(host, paths):
+    entries = "".join(
+        f"<sitemap><loc>https://{host}{path}</loc><lastmod>{time.strftime('%Y-%m-%d', time.gmtime(EPOCH - i * 86400))}</lastmod></sitemap>"
+        for i, path in enumerate(paths)
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+    ).encode()
+
+
+def homepage(host, generator=None, alternates=(), nav=(), teasers=40, footer=()):
+    head = f'<meta name="generator" content="{generator}">' if generator else ""
+    head += "".join(f'<link rel="alternate" type="application/rss+xml" href="{href}">' for href in alternates)
+    nav_html = "".join(f'<a href="{href}">{href.strip("/").rsplit("/", 1)[-1]}</a>' for href in nav)
+    body = "".join(
+        f'<article><img src="/wp-content/uploads/{i}.jpg"><h2><a href="/{2026}/story-{i}/">Story {i}</a></h2>'
+        f"<p>{'Lorem ipsum dolor sit amet. ' * 20}</p></article>"
+        for i in range(teasers)
+    )
+    foot = "".join(f'<a href="{href}">{href}</a>' for href in footer)
+    return (
+        f"<!DOCTYPE html><html><head><title>{host}</title>{head}</head><body>"
+        f"<header><nav>{nav_html}</nav></header><main>{body}</main><footer>{foot}</footer></body></html>"
+    ).encode()
+
+
+# -------------------------------
+# Routing
+# -------------------------------
+class Reply:
+    __slots__ = ("status", "body", "headers", "delay")
+
+    def __init__(self, status=200, body=b"", headers=None, delay=0.0):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.delay = delay
+
+
+def not_found():
+    return Reply(404, b"<html><body>Not found</body></html>", {"Content-Type": "text/html"})
+
+
+def xml(body, content_type="application/xml"):
+    return Reply(200, body, {"Content-Type": content_type})
+
+
+def redirect(location, status=301):
+    return Reply(status, b"", {"Location": location})
+
+
+@lru_cache(maxsize=512)
+def route(profile, host, path):
+    """Reply for one request; cached because documents are deterministic per host."""
+    return ROUTERS[profile](host, path)
+
+
+def route_wordpress(host, path):
+    if path == "/":
+        nav = [f"/category/cat{i}/" for i in range(NAV_CATEGORIES)]
+        body = homepage(
+            host, "WordPress 6.5", alternates=[f"https://{host}/feed/", f"https://{host}/comments/feed/"],
+            nav=nav, teasers=60, footer=[f"https://news.{host}/", "/about/", "/contact/"],
+        )
+        return Reply(200, body, {"Content-Type": "text/html; charset=UTF-8", "X-Gzip": "1"})
+    if path == "/feed":
+        return redirect(f"https://{host}/feed/")
+    if path in ("/feed/", "/comments/feed/") or re.fullmatch(r"/category/cat\d+/feed/", path):
+        return xml(rss(host, path), "application/rss+xml")
+    if path == "/robots.txt":
+        return Reply(200, f"User-agent: *\nSitemap: https://{host}/wp-sitemap.xml\n".encode(), {"Content-Type": "text/plain"})
+    if path == "/wp-sitemap.xml":
+        children = [f"/wp-sitemap-posts-post-{i}.xml" for i in range(1, 6)] + ["/wp-sitemap-taxonomies-category-1.xml"]
+        return xml(sitemap_index(host, children))
+    if re.fullmatch(r"/wp-sitemap-[a-z-]+-\d+\.xml", path):
+        return xml(urlset(host, 2000, prefix=path.strip("/").split(".")[0]))
+    return not_found()
+
+
+def route_bigsitemap(host, path):
+    if path == "/":
+        return Reply(200, homepage(host, teasers=20, nav=["/world/", "/sport/"]), {"Content-Type": "text/html"})
+    if path == "/robots.txt":
+        return Reply(200, f"User-agent: *\nSitemap: https://{host}/sitemap.xml.gz\n".encode(), {"Content-Type": "text/plain"})
+    if path == "/sitemap.xml.gz":
+        return Reply(200, gzip.compress(urlset(host, BIG_SITEMAP_URLS), 6), {"Content-Type": "application/x-gzip"})
+    if path == "/sitemap.xml":
+        return xml(urlset(host, BIG_SITEMAP_URLS))
+    if path == "/rss.xml":
+        return xml(rss(host, path), "application/rss+xml")
+    return not_found()
+
+
+def route_sitemapindex(host, path):
+    if path == "/":
+        return Reply(200, homepage(host, alternates=["/atom.xml"], nav=["/politics/", "/business/"]), {"Content-Type": "text/html"})
+    if path == "/robots.txt":
+        return Reply(200, f"Sitemap: https://{host}/sitemap_index.xml\n".encode(), {"Content-Type": "text/plain"})
+    if path == "/sitemap_index.xml":
+        months = [f"/sitemap-{2026 - i // 12}-{12 - i % 12:02d}.xml" for i in range(INDEX_CHILDREN)]
+        return xml(sitemap_index(host, ["/news-sitemap.xml", *months]))
+    if path == "/news-sitemap.xml":
+        return xml(urlset(host, 500, prefix="news", news=True))
+    if re.fullmatch(r"/sitemap-\d{4}-\d{2}\.xml", path):
+        return xml(urlset(host, CHILD_URLS, prefix=path[9:16]))
+    if path == "/atom.xml":
+        return xml(atom(host), "application/atom+xml")
+    if path in ("/politics/feed/", "/business/feed/"):
+        return xml(rss(host, path), "application/rss+xml")
+    return not_found()
+
+
+def route_slow(host, path):
+    if path == "/":
+        reply = Reply(200, homepage(host, nav=["/tech/", "/science/"]), {"Content-Type": "text/html"})
+    elif path in ("/rss", "/rss.xml"):
+        reply = xml(rss(host, path), "application/rss+xml")
+    elif path == "/sitemap.xml":
+        reply = xml(urlset(host, 5000))
+    else:
+        reply = not_found()
+    reply.delay = SLOW_DELAY
+    return reply
+
+
+def route_throttled(host, path):
+    # The 429-on-first-hit behaviour is applied by the handler (it is stateful)
+    if path == "/":
+        return Reply(200, homepage(host, alternates=["/atom.xml"], nav=["/local/"]), {"Content-Type": "text/html"})
+    if path == "/atom.xml":
+        return xml(atom(host), "application/atom+xml")
+    if path == "/sitemap.xml":
+        return xml(urlset(host, 3000))
+    return not_found()
+
+
+def route_redirect(host, path):
+    if not host.startswith("www."):
+        return redirect(f"https://www.{host}{path}")
+    if path == "/":
+        return Reply(200, homepage(host, alternates=["/rss"], nav=["/opinion/"]), {"Content-Type": "text/html"})
+    if path in ("/rss", "/feed", "/feed.xml"):
+        return redirect(f"https://{host}/feeds/all.xml", 302)
+    if path == "/feeds/all.xml":
+        return xml(rss(host, path), "application/rss+xml")
+    if path == "/sitemap.xml":
+        return redirect(f"https://{host}/sitemaps/main.xml")
+    if path == "/sitemaps/main.xml":
+        return xml(urlset(host, 2000))
+    return not_found()
+
+
+ROUTERS = {
+    "wordpress": route_wordpress,
+    "bigsitemap": route_bigsitemap,
+    "sitemapindex": route_sitemapindex,
+    "slow": route_slow,
+    "throttled": route_throttled,
+    "redirect": route_redirect,
+}
+
+
+# -------------------------------
+# Server
+# -------------------------------
+class PublisherHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    throttled = set()
+    throttled_lock = threading.Lock()
+
+    def do_GET(self):
+        host = self.headers.get("Host", "")
+        site, profile = site_of(host)
+        path = self.path.split("?", 1)[0]
+        if path == RESET_PATH:
+            with self.throttled_lock:
+                self.throttled.clear()
+            self._send(204, b"", {})
+            return
+        if site is None:
+            reply = not_found()
+        elif profile == "throttled" and self._first_hit(host, path):
+            reply = Reply(429, b"slow down", {"Retry-After": str(RETRY_AFTER)})
+        else:
+            reply = route(profile, host.split(":")[0].lower(), path)
+
+        if reply.delay:
+            time.sleep(reply.delay)
+
+        body, headers = reply.body, dict(reply.headers)
+        if reply.status == 200 and body:
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", {"ETag": etag})
+                return
+            headers["ETag"] = etag
+        if headers.pop("X-Gzip", None) and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, 5)
+            headers["Content-Encoding"] = "gzip"
+        self._send(reply.status, body, headers)
+
+    def _first_hit(self, host, path):
+        with self.throttled_lock:
+            if (host, path) in self.throttled:
+                return False
+            self.throttled.add((host, path))
+            return True
+
+    def _send(self, status, body, headers):
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Streaming clients hang up once they have what they need
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PublisherServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def _serve(conn):
+    server = PublisherServer(("127.0.0.1", 0), PublisherHandler)
+    conn.send(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server():
+    """
+    Starts the simulator in a child process (so its memory stays out of the
+    benchmark's RSS). Returns (process, port); terminate the process when done.
+    """
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child,), daemon=True)
+    process.start()
+    return process, parent.recv()
+
+
+def reset_server(port):
+    """Forgets which throttled paths were already hit, so the next run sees its 429s again."""
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{RESET_PATH}", timeout=5):
+        pass
+
+
+if __name__ == "__main__":
+    server = PublisherServer(("127.0.0.1", 8089), PublisherHandler)
+    print("Serving simulated publishers on 127.0.0.1:8089 (Host: <profile>-<n>.bench.test)")
+    server.serve_forever()
@@ -0,0 +1,371 @@
+# run.py
+"""
+Offline benchmarks for AsyncFeedDiscovery and FeedValidator.
+
+    python -m benchmarks.run -o bench.json
+    python -m benchmarks.run --domains 300 --concurrency 100 --baseline bench.json
+
+Every request goes to the local publisher simulator (benchmarks/publishers.py)
+through a transport that rewrites the destination to 127.0.0.1, keeping the
+original Host header. Results are written as JSON; with --baseline the run is
+compared against an earlier file and exits non-zero on regressions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from feeddiscovery.batch import discover_many
+from feeddiscovery.discovery_async import AsyncFeedDiscovery
+from feeddiscovery.feed_validation import FeedValidator
+from feeddiscovery.http_client import build_client
+from feeddiscovery.path_stats import PathStats
+from feeddiscovery.scheduler import RequestScheduler
+from feeddiscovery.sources import SQLiteSource, create_sqlite_sources, stream_urls
+
+from .publishers import PROFILES, make_domains, reset_server, site_of, start_server
+
+# (metric path, higher is better) checked by --baseline
+TRACKED = [
+    ("single.*.requests", False),
+    ("single.*.bytes", False),
+    ("batch.requests_per_discovery", False),
+    ("batch.bytes_per_discovery", False),
+    ("batch.latency.p50", False),
+    ("batch.latency.p99", False),
+    ("batch.domains_per_sec", True),
+    ("batch.peak_rss_mb", False),
+    ("validate.cold.urls_per_sec", True),
+    ("validate.warm.urls_per_sec", True),
+    ("validate.warm.bytes", False),
+]
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+
+
+def latency_summary(values):
+    return {"p50": percentile(values, 0.50), "p99": percentile(values, 0.99), "max": percentile(values, 1.0)}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# -------------------------------
+# Transport: send everything to the simulator and count it
+# -------------------------------
+class Recorder:
+    def __init__(self):
+        self.requests = Counter()
+        self.bytes = Counter()
+        self.statuses = Counter()
+        self.ttfb = []
+
+    def site(self, site):
+        return {"requests": self.requests[site], "bytes": self.bytes[site]}
+
+
+class CountingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, recorder, site):
+        self._stream = stream
+        self._recorder = recorder
+        self._site = site
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            # Wire bytes: counted before httpx undoes Content-Encoding
+            self._recorder.bytes[self._site] += len(chunk)
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class LocalTransport(httpx.AsyncBaseTransport):
+    def __init__(self, port, recorder, max_connections=500):
+        self.port = port
+        self.recorder = recorder
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._transport = httpx.AsyncHTTPTransport(limits=limits)
+
+    async def handle_async_request(self, request):
+        site = site_of(request.url.host)[0] or request.url.host
+        # httpx already set Host from the original URL; only the socket address changes.
+        # A copy keeps the original URL on the request httpx resolves redirects against.
+        local = httpx.Request(
+            request.method, request.url.copy_with(scheme="http", host="127.0.0.1", port=self.port),
+            headers=request.headers, stream=request.stream, extensions=request.extensions,
+        )
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(local)
+        self.recorder.ttfb.append(time.perf_counter() - started)
+        self.recorder.requests[site] += 1
+        self.recorder.statuses[response.status_code] += 1
+        response.stream = CountingStream(response.stream, self.recorder, site)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def local_client(port, recorder, timeout=15):
+    return build_client(timeout=timeout, transport=LocalTransport(port, recorder))
+
+
+def scheduler_from(args):
+    return RequestScheduler(
+        max_concurrency=args.max_requests, per_host=args.per_host, rate=args.per_host_rate, burst=args.per_host,
+    )
+
+
+# -------------------------------
+# Scenarios
+# -------------------------------
+async def bench_single(port, args):
+    """Each profile discovered alone: what one domain costs."""
+    out = {}
+    for profile in PROFILES:
+        domain = f"{profile}-0.bench.test"
+        runs = []
+        for _ in range(args.repeat):
+            reset_server(port)
+            recorder = Recorder()
+            async with local_client(port, recorder) as client:
+                discovery = AsyncFeedDiscovery(
+                    domain, client=client, scheduler=scheduler_from(args), path_stats=args.stats,
+                )
+                started = time.perf_counter()
+                results = await discovery.discover()
+                elapsed = time.perf_counter() - started
+            runs.append((elapsed, recorder, results))
+        elapsed, recorder, results = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+        out[profile] = {
+            "elapsed": round(elapsed, 4),
+            **recorder.site(domain),
+            "feeds": sum(1 for r in results if r["type"] == "feed"),
+            "sitemaps": sum(1 for r in results if r["type"] == "sitemap"),
+            "statuses": dict(recorder.statuses),
+        }
+    return out
+
+
+async def bench_batch(port, args):
+    """Many domains through discover_many on one shared client and scheduler."""
+    domains = make_domains(args.domains)
+    reset_server(port)
+    recorder = Recorder()
+    rss_before = peak_rss_mb()
+    latencies, errors, found = [], 0, Counter()
+    async with local_client(port, recorder) as client:
+        started = time.perf_counter()
+        async for record in discover_many(
+            domains, concurrency=args.concurrency, client=client, scheduler=scheduler_from(args),
+            path_stats=args.stats,
+        ):
+            latencies.append(record["elapsed"])
+            errors += record["error"] is not None
+            found.update(r["type"] for r in record["results"])
+        elapsed = time.perf_counter() - started
+    total_requests = sum(recorder.requests.values())
+    total_bytes = sum(recorder.bytes.values())
+    return {
+        "domains": len(domains),
+        "concurrency": args.concurrency,
+        "elapsed": round(elapsed, 3),
+        "domains_per_sec": round(len(domains) / elapsed, 2),
+        "requests": total_requests,
+        "bytes": total_bytes,
+        "requests_per_discovery": round(total_requests / len(domains), 2),
+        "bytes_per_discovery": round(total_bytes / len(domains)),
+        "latency": latency_summary(latencies),
+        "request_ttfb": latency_summary(recorder.ttfb),
+        "feeds": found["feed"],
+        "sitemaps": found["sitemap"],
+        "errors": errors,
+        "statuses": dict(recorder.statuses),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def feed_urls(args):
+    urls = []
+    for domain in make_domains(args.domains):
+        profile = site_of(domain)[1]
+        if profile == "wordpress":
+            urls.append(f"https://{domain}/feed/")
+            urls.extend(f"https://{domain}/category/cat{i}/feed/" for i in range(args.feeds_per_site))
+        elif profile == "sitemapindex":
+            urls.append(f"https://{domain}/atom.xml")
+        elif profile == "redirect":
+            urls.append(f"https://{domain}/rss")
+        elif profile == "bigsitemap":
+            urls.append(f"https://{domain}/rss.xml")
+    return urls
+
+
+async def bench_validate(port, args):
+    """
+    FeedValidator over the simulated feeds: a cold run, then a warm (conditional
+    GET) run. URLs stream from a local SQLite copy of the source/domain tables,
+    the same path start_check takes for domain names.
+    """
+    urls = feed_urls(args)
+    by_domain = {}
+    for url in urls:
+        by_domain.setdefault(httpx.URL(url).host, []).append(url)
+    out = {"urls": len(urls)}
+    with tempfile.TemporaryDirectory() as tmp:
+        sources_path = create_sqlite_sources(os.path.join(tmp, "sources.sqlite3"), by_domain)
+        validator = FeedValidator(
+            state_path=os.path.join(tmp, "state.sqlite3"), history_path=os.path.join(tmp, "history.sqlite3"),
+        )
+        for label in ("cold", "warm"):
+            recorder = Recorder()
+            validator.report_data = []
+            async with local_client(port, recorder) as client:
+                started = time.perf_counter()
+                await validator.check_urls_async(
+                    stream_urls([SQLiteSource(sources_path, list(by_domain))]),
+                    concurrency=args.concurrency, per_host=args.per_host,
+                    per_host_rate=args.per_host_rate, client=client,
+                )
+                elapsed = time.perf_counter() - started
+            out[label] = {
+                "elapsed": round(elapsed, 3),
+                "urls_per_sec": round(len(urls) / elapsed, 2),
+                "requests": sum(recorder.requests.values()),
+                "bytes": sum(recorder.bytes.values()),
+                "request_ttfb": latency_summary(recorder.ttfb),
+                "rows": dict(Counter(row["status"] for row in validator.report_data)),
+                "statuses": dict(recorder.statuses),
+            }
+        validator.close()
+    out["peak_rss_mb"] = peak_rss_mb()
+    return out
+
+
+SCENARIOS = {"single": bench_single, "batch": bench_batch, "validate": bench_validate}
+
+
+# -------------------------------
+# Reporting
+# -------------------------------
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(data, prefix=""):
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, path + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def _matches(pattern, path):
+    a, b = pattern.split("."), path.split(".")
+    return len(a) == len(b) and all(x in ("*", y) for x, y in zip(a, b))
+
+
+def compare(current, baseline, tolerance):
+    """Tracked metrics that got worse than baseline by more than `tolerance` (a fraction)."""
+    before = dict(flatten(baseline["scenarios"]))
+    regressions = []
+    for path, value in flatten(current["scenarios"]):
+        for pattern, higher_is_better in TRACKED:
+            if not _matches(pattern, path) or not before.get(path):
+                continue
+            change = (value - before[path]) / before[path]
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append({"metric": path, "baseline": before[path], "current": value,
+                                    "change": round(change, 3)})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-o", "--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run; repeatable (default: all)")
+    parser.add_argument("--domains", type=int, default=120, help="Simulated domains for batch/validate")
+    parser.add_argument("-c", "--concurrency", type=int, default=50, help="Domains (or feeds) in flight")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per profile in the single scenario (median kept)")
+    parser.add_argument("--feeds-per-site", type=int, default=20, help="Category feeds validated per WordPress site")
+    parser.add_argument("--max-requests", type=int, default=64, help="Global concurrent request cap")
+    parser.add_argument("--per-host", type=int, default=6, help="Concurrent requests per host")
+    parser.add_argument("--per-host-rate", type=float, default=10.0, help="Requests/second per host")
+    parser.add_argument("--path-stats", action="store_true",
+                        help="Share one in-memory PathStats across discoveries (learns as the run goes)")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed regression as a fraction")
+    return parser.parse_args(argv)
+
+
+async def run(args, port):
+    scenarios = {}
+    for name in args.scenario or list(SCENARIOS):
+        scenarios[name] = await SCENARIOS[name](port, args)
+    return scenarios
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # A benchmark batch is small, so trust the stats after fewer probes than in production
+    args.stats = PathStats(":memory:", min_probes=20) if args.path_stats else None
+    process, port = start_server()
+    try:
+        scenarios = asyncio.run(run(args, port))
+    finally:
+        process.terminate()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "stats")},
+        },
+        "scenarios": scenarios,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(report, json.load(fh), args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    for r in regressions:
+        print(f"REGRESSION {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.1%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# batch.py
+import asyncio
+import time
+
+from .discovery_async import AsyncFeedDiscovery
+from .utils import normalize_domain
+
+
+def read_domains(path):
+    """Yields domains from a text file, one per line. Blank lines and '#' comments are skipped."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            domain = line.split("#", 1)[0].strip()
+            if domain:
+                yield domain
+
+
+async def _aiter(domains):
+    if hasattr(domains, "__aiter__"):
+        async for domain in domains:
+            yield domain
+    else:
+        for domain in domains:
+            yield domain
+
+
+async def discover_one(domain, cache=None, **kwargs):
+    """Runs one discovery and wraps the outcome (or error) in a result record."""
+    started = time.perf_counter()
+    record = {"domain": normalize_domain(domain), "results": [], "complete": False, "error": None}
+    try:
+        if cache is not None:
+            record["results"], record["complete"] = await cache.discover(domain, **kwargs)
+        else:
+            discovery = AsyncFeedDiscovery(domain, **kwargs)
+            record["results"] = await discovery.discover()
+            record["complete"] = discovery.complete
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+async def discover_many(domains, concurrency=50, cache=None, **kwargs):
+    """
+    Discovers feeds for many domains, yielding one record per domain as soon
+    as it completes. `domains` may be a (lazy) sync or async iterable; it is
+    only pulled from when a slot frees up, so memory stays flat for any batch size.
+    kwargs are passed to AsyncFeedDiscovery (client, scheduler, timeout, ...).
+    """
+    pending = set()
+    try:
+        async for domain in _aiter(domains):
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.create_task(discover_one(domain, cache=cache, **kwargs)))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Consumer went away (client disconnect, Ctrl-C): stop the in-flight work
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
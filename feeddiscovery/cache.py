@@ -0,0 +1,243 @@
+# cache.py
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .discovery_async import AsyncFeedDiscovery
+from .utils import normalize_domain
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (value, stored_at, expires_at)
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, stored_at, expires_at = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value, stored_at
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        self._data[key] = (value, now, now + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def set_many(self, items, ttl):
+        for key, value in items:
+            self.set(key, value, ttl)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """On-disk backend so the cache survives restarts. Values are stored as JSON."""
+
+    def __init__(self, path="feed_cache.sqlite3", purge_every=1000):
+        self.path = path
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[2] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl):
+        self.set_many([(key, value)], ttl)
+
+    def set_many(self, items, ttl):
+        """Writes several entries in one transaction (one commit)."""
+        now = time.time()
+        rows = [(key, json.dumps(value), now, now + ttl) for key, value in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)", rows,
+            )
+            before = self._writes
+            self._writes += len(rows)
+            if self._writes // self.purge_every != before // self.purge_every:
+                self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class DiscoveryCache:
+    """
+    Cache in front of AsyncFeedDiscovery.discover().
+
+    - positive results per domain, fresh for `ttl` seconds
+    - after that they are served stale for up to `stale_ttl` more seconds
+      while a single background refresh runs
+    - per-URL negative entries (404/410) so known-dead COMMON_PATHS are skipped,
+      kept apart from the domain results: a batch writes dozens per domain and
+      would otherwise evict every positive entry from a bounded LRU. They are
+      buffered and written `negative_batch_size` at a time (or every
+      `negative_flush_interval` seconds), so a SQLite backend doesn't commit
+      once per 404 on the event loop; call close() to write the rest
+    - runs that hit network errors (homepage, robots.txt, or every probe) are
+      not cached, so a blip doesn't hide a publisher's feeds for a day
+    """
+
+    def __init__(self, backend=None, ttl=6 * 3600, stale_ttl=24 * 3600,
+                 negative_ttl=24 * 3600, negative_statuses=(404, 410),
+                 negative_backend=None, negative_maxsize=200000,
+                 negative_batch_size=500, negative_flush_interval=30.0):
+        self.backend = backend or MemoryBackend()
+        # An unbounded (SQLite) backend can hold both; an LRU gets its own
+        if negative_backend is None:
+            negative_backend = MemoryBackend(negative_maxsize) if isinstance(self.backend, MemoryBackend) else self.backend
+        self.negative_backend = negative_backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.negative_statuses = negative_statuses
+        self.negative_batch_size = negative_batch_size
+        self.negative_flush_interval = negative_flush_interval
+        self._dead_pending = {}  # key -> status_code, not yet written
+        self._dead_flushed_at = time.monotonic()
+        self._inflight = {}  # domain -> Task, one discovery per domain at a time
+
+    # --- Positive entries (per domain) ---
+    def get_results(self, domain):
+        """Returns (results, is_stale) or None."""
+        hit = self.backend.get(f"domain:{normalize_domain(domain)}")
+        if hit is None:
+            return None
+        results, stored_at = hit
+        return results, time.time() - stored_at > self.ttl
+
+    def set_results(self, domain, results):
+        self.backend.set(f"domain:{normalize_domain(domain)}", results, self.ttl + self.stale_ttl)
+
+    # --- Negative entries (per URL) ---
+    def is_dead(self, url):
+        key = f"dead:{url}"
+        return key in self._dead_pending or self.negative_backend.get(key) is not None
+
+    def mark_dead(self, url, status_code):
+        if status_code not in self.negative_statuses:
+            return
+        self._dead_pending[f"dead:{url}"] = status_code
+        if (len(self._dead_pending) >= self.negative_batch_size
+                or time.monotonic() - self._dead_flushed_at >= self.negative_flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Writes buffered negative entries."""
+        self._dead_flushed_at = time.monotonic()
+        if not self._dead_pending:
+            return
+        pending, self._dead_pending = self._dead_pending, {}
+        self.negative_backend.set_many(pending.items(), self.negative_ttl)
+
+    def close(self):
+        self.flush()
+        self.backend.close()
+        if self.negative_backend is not self.backend:
+            self.negative_backend.close()
+
+    async def discover(self, domain, **kwargs):
+        """
+        Cached discovery. kwargs are passed to AsyncFeedDiscovery.
+        Returns (results, complete); cache hits are always complete.
+        A `trace` (metrics.DiscoveryTrace) always gets a live, private run.
+        """
+        if kwargs.get("trace") is not None:
+            return await self._run(domain, kwargs)
+        hit = self.get_results(domain)
+        if hit is not None:
+            results, stale = hit
+            if stale:
+                self._refresh(domain, kwargs)
+            return results, True
+        if kwargs.get("deadline") or kwargs.get("stop_when"):
+            # Bounded runs stay private so their partial results never reach other waiters
+            return await self._run(domain, kwargs)
+        # shield: a disconnecting caller must not cancel a run others are awaiting
+        return await asyncio.shield(self._refresh(domain, kwargs))
+
+    async def iter_discover(self, domain, **kwargs):
+        """Streaming counterpart of discover(): cached results at once, live ones as found."""
+        traced = kwargs.get("trace") is not None
+        hit = None if traced else self.get_results(domain)
+        task = None if traced else self._inflight.get(normalize_domain(domain))
+        if hit is not None or task is not None:
+            if hit is not None:
+                results, stale = hit
+                if stale:
+                    self._refresh(domain, kwargs)
+            else:
+                results, _complete = await asyncio.shield(task)
+            for result in results:
+                yield result
+            return
+
+        discovery = AsyncFeedDiscovery(domain, cache=self, **kwargs)
+        async for result in discovery.iter_discover():
+            yield result
+        if discovery.complete:
+            self.set_results(domain, list({r["url"]: r for r in discovery.results}.values()))
+
+    def _refresh(self, domain, kwargs):
+        key = normalize_domain(domain)
+        task = self._inflight.get(key)
+        if task is None:
+            # Shared refreshes always run to completion, whatever the caller's budget
+            kwargs = {k: v for k, v in kwargs.items() if k not in ("deadline", "stop_when")}
+            task = asyncio.ensure_future(self._run(domain, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    def _done(self, key, task):
+        self._inflight.pop(key, None)
+        # Background refreshes have nobody awaiting them; consume the exception
+        if not task.cancelled():
+            task.exception()
+
+    async def _run(self, domain, kwargs):
+        discovery = AsyncFeedDiscovery(domain, cache=self, **kwargs)
+        results = await discovery.discover()
+        # Only complete runs are worth caching; a cut-short or network-failed
+        # run (complete=False, see AsyncFeedDiscovery.reliable) would hide feeds
+        if discovery.complete:
+            self.set_results(domain, results)
+        return results, discovery.complete
@@ -0,0 +1,96 @@
+# candidates.py
+import asyncio
+import itertools
+from typing import NamedTuple, Optional
+
+from lxml import html
+
+# Probe order, lowest first. Declared feeds and robots sitemaps are near-certain
+# hits; CMS guesses are cheap and likely; category suffix guesses are the long tail.
+PRIORITY_LINK_ALTERNATE = 0
+PRIORITY_ROBOTS = 0
+PRIORITY_SITEMAP_CHILD = 5
+PRIORITY_CMS = 10
+PRIORITY_COMMON = 20
+PRIORITY_TEXT_LINK = 30
+PRIORITY_SUBDOMAIN = 40
+PRIORITY_SITEMAP_ARCHIVE = 45
+PRIORITY_CATEGORY = 50
+
+# Generator <meta> substrings and body markers that identify a platform
+CMS_GENERATORS = {
+    "wordpress": "wordpress",
+    "drupal": "drupal",
+    "ghost": "ghost",
+    "hugo": "hugo",
+    "blogger": "blogger",
+    "joomla": "joomla",
+}
+CMS_MARKERS = {
+    "wordpress": (b"/wp-content/", b"/wp-includes/", b"/wp-json/"),
+    "drupal": (b"drupal-settings-json", b"/sites/default/files/"),
+    "ghost": (b"ghost-portal", b"/ghost/api/"),
+    "blogger": (b"blogger.com/static", b"blogblog.com"),
+    "joomla": (b"/media/jui/", b"/components/com_"),
+}
+
+
+class Candidate(NamedTuple):
+    url: str
+    source: str
+    priority: int = PRIORITY_COMMON
+    # For category guesses: (category base URL, suffix) so a hit can unlock the rest
+    hint: Optional[tuple] = None
+    # Sitemap-index nesting level (robots/common sitemaps are 0)
+    depth: int = 0
+
+
+class CandidateQueue(asyncio.PriorityQueue):
+    """Priority queue of Candidates; FIFO within the same priority."""
+
+    def __init__(self):
+        super().__init__()
+        self._seq = itertools.count()
+
+    def push(self, candidate):
+        self.put_nowait((candidate.priority, next(self._seq), candidate))
+
+    async def pop(self):
+        _priority, _seq, candidate = await self.get()
+        return candidate
+
+
+def detect_platform(content, doc):
+    """Fingerprints the CMS from the homepage. Returns a key of CMS_PATHS or None."""
+    for generator in doc.xpath("//meta[translate(@name, 'GENERATOR', 'generator')='generator']/@content"):
+        generator = generator.lower()
+        for platform, needle in CMS_GENERATORS.items():
+            if needle in generator:
+                return platform
+    for platform, markers in CMS_MARKERS.items():
+        if any(marker in content for marker in markers):
+            return platform
+    return None
+
+
+class HomepageLinks(NamedTuple):
+    # Raw hrefs, resolved by the caller; plain lists so it pickles across processes
+    alternates: list
+    platform: Optional[str]
+    nav: list
+    text: list
+
+
+def extract_homepage_links(content):
+    """
+    Parses the homepage once and pulls out every link discovery cares about.
+    Pure function of the bytes, so it can run in a ParseExecutor worker.
+    """
+    doc = html.fromstring(content)
+    # Declared feeds (handles external hosts like feeds.mcclatchy.com)
+    alternates = doc.xpath("//link[@rel='alternate' and (contains(@type, 'rss') or contains(@type, 'xml') or contains(@type, 'atom'))]/@href")
+    # We target <nav>, <header>, and <footer> for cleaner link extraction
+    nav = doc.xpath("//nav//a/@href | //header//a/@href | //footer//a/@href")
+    # Links with "RSS" or "Feed" in the text
+    text = doc.xpath("//a[contains(translate(., 'RSS', 'rss'), 'rss') or contains(translate(., 'FEED', 'feed'), 'feed')]/@href")
+    return HomepageLinks([str(h) for h in alternates], detect_platform(content, doc), [str(h) for h in nav], [str(h) for h in text])
@@ -0,0 +1,45 @@
+# canonical.py
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from .patterns import BAD_PATTERNS
+
+# Query parameters that only track the click, never change the document
+TRACKING_PARAMS = re.compile(r"^(utm_\w*|fbclid|gclid|mc_cid|mc_eid)$", re.IGNORECASE)
+DEFAULT_PORTS = (None, 80, 443)
+
+# One pass over the URL instead of one substring test per pattern
+BAD_URL_RE = re.compile("|".join(re.escape(p) for p in BAD_PATTERNS), re.IGNORECASE)
+
+
+def is_bad_url(url):
+    return BAD_URL_RE.search(url) is not None
+
+
+def canonical_url(url):
+    """
+    Dedup key for a candidate URL; equivalent URLs give the same key.
+
+    - scheme is dropped (http and https are the same feed), as are the
+      fragment, a default port, a leading "www." and a trailing slash
+    - the host is lowercased; the path keeps its case
+    - the query is kept but sorted, minus utm_*/fbclid-style tracking params
+
+    The key is for comparison only, never for fetching.
+    """
+    parts = urlsplit(url.strip())
+    try:
+        port = parts.port
+    except ValueError:
+        return url.strip().lower()
+    host = (parts.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host if port in DEFAULT_PORTS else f"{host}:{port}"
+
+    query = ""
+    if parts.query:
+        params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k)]
+        query = urlencode(sorted(params))
+    key = netloc + parts.path.rstrip("/")
+    return f"{key}?{query}" if query else key
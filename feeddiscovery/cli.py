@@ -0,0 +1,82 @@
+# cli.py
+import argparse
+import asyncio
+import json
+import sys
+
+from .batch import discover_many, read_domains
+from .cache import DiscoveryCache, SQLiteBackend
+from .http_client import build_client
+from .path_stats import PathStats
+from .scheduler import RequestScheduler
+from .stop_conditions import parse_stop_condition
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m feeddiscovery",
+        description="Discover RSS/Atom feeds and sitemaps for a list of domains. Writes NDJSON.",
+    )
+    parser.add_argument("input", help="File with one domain per line, or '-' for stdin")
+    parser.add_argument("-o", "--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=50, help="Domains discovered at once")
+    parser.add_argument("--max-requests", type=int, default=256, help="Global in-flight HTTP requests")
+    parser.add_argument("--per-host", type=int, default=6, help="In-flight HTTP requests per host")
+    parser.add_argument("--timeout", type=float, default=15, help="HTTP timeout in seconds")
+    parser.add_argument("--http2", action="store_true", help="Enable HTTP/2 (needs the h2 package)")
+    parser.add_argument("--deadline", type=float, help="Time budget per domain in seconds")
+    parser.add_argument("--stop", help="Stop condition per domain, e.g. 'feeds:1' or 'feed+sitemap'")
+    parser.add_argument("--cache", help="SQLite cache path; reuses results across runs")
+    parser.add_argument("--path-stats", help="SQLite path-statistics store; probes high-yield paths first")
+    return parser
+
+
+def _stdin_domains():
+    for line in sys.stdin:
+        domain = line.split("#", 1)[0].strip()
+        if domain:
+            yield domain
+
+
+async def run(args, out):
+    domains = _stdin_domains() if args.input == "-" else read_domains(args.input)
+    cache = DiscoveryCache(backend=SQLiteBackend(args.cache)) if args.cache else None
+    scheduler = RequestScheduler(max_concurrency=args.max_requests, per_host=args.per_host)
+    path_stats = PathStats(args.path_stats) if args.path_stats else None
+
+    async with build_client(
+        timeout=args.timeout,
+        max_connections=args.max_requests,
+        max_keepalive_connections=args.max_requests,
+        http2=args.http2,
+    ) as client:
+        count = 0
+        try:
+            async for record in discover_many(
+                domains, concurrency=args.concurrency, cache=cache,
+                client=client, scheduler=scheduler, timeout=args.timeout,
+                deadline=args.deadline, stop_when=parse_stop_condition(args.stop),
+                path_stats=path_stats,
+            ):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                count += 1
+        finally:
+            if path_stats is not None:
+                path_stats.close()
+            if cache is not None:
+                cache.close()
+    print(f"Discovered {count} domains.", file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        asyncio.run(run(args, out))
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
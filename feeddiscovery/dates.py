@@ -0,0 +1,104 @@
+# dates.py
+from datetime import datetime, timezone
+from email.utils import parsedate_tz, mktime_tz
+
+from dateutil import parser as dateutil_parser
+
+# strptime formats seen in the wild that neither fast path accepts
+EXTRA_FORMATS = (
+    "%a, %d %b %Y %H:%M:%S %Z",
+    "%a, %d %b %Y %H:%M %z",
+    "%d %b %Y %H:%M:%S %z",
+    "%Y-%m-%d %H:%M:%S %z",
+    "%Y/%m/%d %H:%M:%S",
+)
+
+# Slash dates are ambiguous (03/04/2024); the order follows DateParser(dayfirst=...)
+MONTH_FIRST_FORMAT = "%m/%d/%Y %H:%M:%S"
+DAY_FIRST_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+
+def parse_iso8601(value):
+    """W3C-DTF / ISO 8601 (Atom <updated>, sitemap <lastmod>)."""
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+def parse_rfc822(value):
+    """RFC 822 / 2822 (RSS <pubDate>), including named zones like GMT or EST."""
+    parts = parsedate_tz(value)
+    if parts is None:
+        raise ValueError(value)
+    if parts[9] is None:
+        return datetime(*parts[:6])
+    return datetime.fromtimestamp(mktime_tz(parts), timezone.utc)
+
+
+def _strptime_tier(fmt):
+    def parse(value):
+        return datetime.strptime(value, fmt)
+    return parse
+
+
+def parse_dateutil(value, dayfirst=False):
+    return dateutil_parser.parse(value, dayfirst=dayfirst)
+
+
+class DateParser:
+    """
+    Tiered date parser: the ISO 8601 and RFC 822 fast paths first, a few
+    explicit strptime formats next, dateutil only as the last resort.
+    The tier that worked is remembered per key (feed URL, host), so a feed's
+    next date goes straight to the right parser.
+    `dayfirst` decides ambiguous slash dates; the default (month first)
+    matches what plain dateutil has always returned here.
+    """
+
+    def __init__(self, max_memo=200000, dayfirst=False):
+        self.dayfirst = dayfirst
+        slash_format = DAY_FIRST_FORMAT if dayfirst else MONTH_FIRST_FORMAT
+        self.tiers = [
+            ("iso8601", parse_iso8601),
+            ("rfc822", parse_rfc822),
+            *((fmt, _strptime_tier(fmt)) for fmt in (*EXTRA_FORMATS, slash_format)),
+            ("dateutil", lambda value: parse_dateutil(value, dayfirst)),
+        ]
+        self._by_name = dict(self.tiers)
+        self.max_memo = max_memo
+        self._memo = {}
+
+    def parse(self, value, keys=()):
+        """Returns a datetime (UTC-assumed when naive) or None."""
+        if not value:
+            return None
+        value = str(value).strip()
+
+        for key in keys:
+            name = self._memo.get(key)
+            if name is not None:
+                try:
+                    return self._aware(self._by_name[name](value))
+                except (ValueError, OverflowError, TypeError):
+                    break
+
+        for name, tier in self.tiers:
+            try:
+                dt = tier(value)
+            except (ValueError, OverflowError, TypeError):
+                continue
+            self._remember(keys, name)
+            return self._aware(dt)
+        return None
+
+    def _remember(self, keys, name):
+        if len(self._memo) >= self.max_memo:
+            self._memo.clear()
+        for key in keys:
+            self._memo[key] = name
+
+    @staticmethod
+    def _aware(dt):
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=timezone.utc)
+        return dt
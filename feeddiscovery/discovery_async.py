@@ -1,123 +1,385 @@
 import asyncio
-import httpx
-from lxml import html
+import time
+from contextlib import asynccontextmanager
 from urllib.parse import urljoin, urlparse
 # Import the newly expanded patterns
-from .patterns import COMMON_PATHS, FEED_PATTERNS, SITEMAP_PATTERNS, BAD_PATTERNS
+from .patterns import (
+    COMMON_PATHS, FEED_PATTERNS, SITEMAP_PATTERNS,
+    CMS_PATHS, CATEGORY_SUFFIXES, COMMON_PATH_SUFFIXES,
+)
+from .canonical import canonical_url, is_bad_url
+from .candidates import (
+    Candidate, CandidateQueue, extract_homepage_links,
+    PRIORITY_LINK_ALTERNATE, PRIORITY_ROBOTS, PRIORITY_CMS, PRIORITY_COMMON,
+    PRIORITY_TEXT_LINK, PRIORITY_SUBDOMAIN, PRIORITY_CATEGORY,
+    PRIORITY_SITEMAP_CHILD, PRIORITY_SITEMAP_ARCHIVE,
+)
+from .sitemaps import MAX_CHILDREN, MAX_DEPTH, classify_sitemap
 from .utils import normalize_domain
-from .validators_async import validate_feed, validate_sitemap
+from .http_client import build_client
+from .metrics import CURRENT_TRACE, DISCOVERY_SECONDS, INFLIGHT_DISCOVERIES, record_candidate, record_error
+from .parsing import INLINE
+from .scheduler import RequestScheduler
+from .validators_async import MAX_REDIRECTS, SNIFF_BYTES, classify_url
 
 class AsyncFeedDiscovery:
-    def __init__(self, domain_url, timeout=15):
+    # Category pages probed with every suffix before one is known to work on the host
+    CATEGORY_PILOTS = 2
+    # Seconds common-path guessing waits for the homepage fingerprint (path_stats only)
+    PLATFORM_WAIT = 2.0
+
+    def __init__(self, domain_url, timeout=15, client=None, scheduler=None, max_workers=16, cache=None,
+                 deadline=None, stop_when=None, max_sitemap_depth=MAX_DEPTH, max_sitemap_children=MAX_CHILDREN,
+                 parse_executor=None, trace=None, path_stats=None):
         self.domain = normalize_domain(domain_url)
         self.base_url = f"https://{self.domain}"
         self.timeout = timeout
+        # Optional shared httpx.AsyncClient (see http_client.build_client); the
+        # caller owns its lifetime. Without one, each discover() opens its own.
+        self.client = client
+        # Per-host/global limits and 429 backoff; share one across discoveries
+        self.scheduler = scheduler or RequestScheduler()
+        self.max_workers = max_workers
+        # parsing.ParseExecutor for large homepages; small ones parse inline
+        self.parse_executor = parse_executor or INLINE
+        # Optional metrics.DiscoveryTrace, filled with requests/candidates/errors as the run goes
+        self.trace = trace
+        # Optional path_stats.PathStats: orders/prunes guessed paths by past hit rate
+        self.path_stats = path_stats
+        # Guessed candidate URL -> path, for recording its outcome in path_stats
+        self._probe_paths = {}
+        self._fingerprinted = None
+        # Optional cache.DiscoveryCache, used here for per-URL negative entries
+        self.cache = cache
+        # Time budget in seconds and an optional stop condition (see
+        # stop_conditions.py). Either one ends the run early with complete=False.
+        self.deadline = deadline
+        self.stop_when = stop_when
+        self.complete = False
+        # Sitemap-index walk limits: nesting depth and children kept per index
+        self.max_sitemap_depth = max_sitemap_depth
+        self.max_sitemap_children = max_sitemap_children
+        self.stopped_by = None
+        # Strategies that failed outright (homepage, robots) and fetched/errored probe counts
+        self.failures = []
+        self._probes = 0
+        self._probe_errors = 0
         self.results = []
-        # Track seen URLs to prevent redundant network calls
+        # Track seen URLs (canonical_url keys, redirect targets included) to prevent redundant network calls
         self.seen_urls = set()
+        # Every strategy feeds scored Candidates into this one queue
+        self._queue = None
+        self.platform = None
+        # Category pruning: host -> [category bases], host -> suffix that worked
+        self._categories = {}
+        self._category_suffix = {}
+        # Validated results on their way out of iter_discover()
+        self._found = None
+
+    @asynccontextmanager
+    async def _client_scope(self):
+        if self.client is not None:
+            yield self.client
+            return
+        async with build_client(timeout=self.timeout) as client:
+            yield client
+
+    @property
+    def reliable(self):
+        """
+        False when the homepage/robots fetch failed (transport error, 429, 5xx)
+        or every probe errored (DNS down, network blip). A 4xx is an answer.
+        """
+        if self.failures:
+            return False
+        return not (self._probes and self._probe_errors == self._probes)
 
     async def discover(self):
-        # follow_redirects=True is vital for Cultura Colectiva and NewsObserver
-        async with httpx.AsyncClient(
-            timeout=self.timeout, 
-            headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"},
-            follow_redirects=True 
-        ) as client:
+        async for _ in self.iter_discover():
+            pass
+
+        # Final deduplication
+        unique = {r["url"]: r for r in self.results}
+        return list(unique.values())
+
+    async def iter_discover(self):
+        """
+        Async-generator variant of discover(): yields each result dict the
+        moment it is validated instead of waiting for the slowest candidate.
+        """
+        async with self._client_scope() as client:
+            self._queue = CandidateQueue()
+            self._found = asyncio.Queue()
+            self._fingerprinted = asyncio.Event()
+            workers = [asyncio.create_task(self._worker(client)) for _ in range(self.max_workers)]
+            strategies = asyncio.create_task(self._run_strategies(client))
+            loop = asyncio.get_running_loop()
+            ends_at = loop.time() + self.deadline if self.deadline else None
+            started = time.perf_counter()
+            INFLIGHT_DISCOVERIES.inc()
+            try:
+                while True:
+                    try:
+                        timeout = None if ends_at is None else max(0.0, ends_at - loop.time())
+                        result = await asyncio.wait_for(self._found.get(), timeout)
+                    except asyncio.TimeoutError:
+                        self.stopped_by = "deadline"
+                        break
+                    if result is None:
+                        # Ran out of candidates; only a full picture if the fetches worked
+                        self.complete = self.reliable
+                        if not self.complete:
+                            self.stopped_by = "errors"
+                        break
+                    yield result
+                    if self.stop_when is not None and self.stop_when(self.results):
+                        self.stopped_by = "condition"
+                        break
+            finally:
+                # Also reached when the consumer stops early: drop outstanding work
+                for task in [strategies, *workers]:
+                    task.cancel()
+                await asyncio.gather(strategies, *workers, return_exceptions=True)
+                INFLIGHT_DISCOVERIES.dec()
+                outcome = "complete" if self.complete else (self.stopped_by or "cancelled")
+                DISCOVERY_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+    async def _run_strategies(self, client):
+        # Tasks copy the context, so this only tags requests made for this run
+        CURRENT_TRACE.set(self.trace)
+        try:
             await asyncio.gather(
                 self._guess_common_paths(client),
                 self._parse_homepage_and_nav(client),
                 self._parse_robots(client),
             )
+            await self._queue.join()
+        finally:
+            self._found.put_nowait(None)
 
-        # Final deduplication
-        unique = {r["url"]: r for r in self.results}
-        return list(unique.values())
+    def _add_result(self, result):
+        self.results.append(result)
+        self._found.put_nowait(result)
+
+    def _enqueue(self, url, source, priority=PRIORITY_COMMON, hint=None, depth=0):
+        self._queue.push(Candidate(url, source, priority, hint, depth))
+
+    async def _worker(self, client):
+        CURRENT_TRACE.set(self.trace)
+        while True:
+            candidate = await self._queue.pop()
+            try:
+                await self._validate_and_add(client, candidate)
+            finally:
+                self._queue.task_done()
+
+    async def _fetch(self, client, url):
+        """
+        Homepage and robots.txt go through the same politeness limits and
+        429/503 backoff-and-retry as candidates. Returns None for a definitive
+        4xx (403 bot wall, 404, 410): the strategy simply has nothing. A 429
+        or 5xx that outlasted the retries raises, since that run can't be trusted.
+        """
+        r = await self.scheduler.submit(url, client.get, url)
+        if r.status_code == 429 or r.status_code >= 500:
+            r.raise_for_status()
+        if not r.is_success:
+            return None
+        return r
 
     async def _parse_homepage_and_nav(self, client):
         try:
-            r = await client.get(self.base_url)
-            doc = html.fromstring(r.content)
-            candidate_links = set()
+            r = await self._fetch(client, self.base_url)
+            if r is None:
+                return
+            # Big homepages parse off the event loop (see parsing.ParseExecutor)
+            links = await self.parse_executor.run(extract_homepage_links, r.content)
 
             # 1. FIXED: Extract ALL link alternates (handles external feeds.mcclatchy.com)
-            xpath_query = "//link[@rel='alternate' and (contains(@type, 'rss') or contains(@type, 'xml') or contains(@type, 'atom'))]/@href"
-            for href in doc.xpath(xpath_query):
-                candidate_links.add(urljoin(self.base_url, href))
-
-            # 2. NAVBAR & CATEGORY LOGIC: Find categories and subdomains
-            # We target <nav>, <header>, and <footer> for cleaner link extraction
-            nav_links = doc.xpath("//nav//a/@href | //header//a/@href | //footer//a/@href")
-            
-            for href in nav_links:
+            # Declared feeds are near-certain hits, so they jump the queue
+            for href in links.alternates:
+                self._enqueue(urljoin(self.base_url, href), "link_alternate", PRIORITY_LINK_ALTERNATE)
+
+            # 2. CMS FINGERPRINT: platform-specific paths (WordPress /feed/, wp-sitemap.xml, ...)
+            self.platform = links.platform
+            self._fingerprinted.set()
+            for path in self._planned_paths(CMS_PATHS.get(self.platform, [])):
+                self._enqueue_path(path, "cms", PRIORITY_CMS)
+
+            # 3. NAVBAR & CATEGORY LOGIC: Find categories and subdomains
+            subdomains = set()
+
+            for href in links.nav:
                 full_url = urljoin(self.base_url, href)
                 parsed = urlparse(full_url)
 
                 # Only process links that belong to our target domain or its subdomains
                 if self.domain in parsed.netloc:
-                    # If it has a path (category), try common suffixes (e.g., /news/feed/)
+                    # If it has a path (category), remember it for suffix guesses (e.g., /news/feed/)
                     if parsed.path and len(parsed.path) > 1:
-                        # Add variations for the category
-                        path_base = full_url.rstrip('/')
-                        candidate_links.update([
-                            f"{path_base}/feed/",
-                            f"{path_base}/rss.xml",
-                            f"{path_base}/index.xml",
-                            f"{path_base}.xml"
-                        ])
-                    
+                        bases = self._categories.setdefault(parsed.netloc, [])
+                        path_base = full_url.split('?')[0].split('#')[0].rstrip('/')
+                        if path_base not in bases:
+                            bases.append(path_base)
+
                     # Handle Subdomains: if 'tech.mobihealthnews.com' is found
-                    if parsed.netloc != self.domain:
+                    if parsed.netloc != self.domain and parsed.netloc not in subdomains:
+                        subdomains.add(parsed.netloc)
                         sub_base = f"{parsed.scheme}://{parsed.netloc}"
-                        candidate_links.update([
-                            urljoin(sub_base, "feed/"),
-                            urljoin(sub_base, "rss.xml")
-                        ])
+                        self._enqueue(urljoin(sub_base, "feed/"), "nav_discovery", PRIORITY_SUBDOMAIN)
+                        self._enqueue(urljoin(sub_base, "rss.xml"), "nav_discovery", PRIORITY_SUBDOMAIN)
 
-            # 3. TEXT SEARCH: Links with "RSS" or "Feed" in the text
-            text_links = doc.xpath("//a[contains(translate(., 'RSS', 'rss'), 'rss') or contains(translate(., 'FEED', 'feed'), 'feed')]/@href")
-            for href in text_links:
-                candidate_links.add(urljoin(self.base_url, href))
+            # 4. TEXT SEARCH: Links with "RSS" or "Feed" in the text
+            for href in links.text:
+                self._enqueue(urljoin(self.base_url, href), "nav_discovery", PRIORITY_TEXT_LINK)
 
-            # Validate all candidates in parallel
-            tasks = [self._validate_and_add(client, u, "nav_discovery") for u in candidate_links]
-            await asyncio.gather(*tasks)
+            # Categories: a known suffix goes straight to every category on the
+            # host; otherwise pilot all suffixes on a couple and wait for a hit
+            for host, bases in self._categories.items():
+                suffix = self._category_suffix.get(host)
+                if suffix:
+                    self._expand_categories(host, suffix)
+                    continue
+                for base in bases[:self.CATEGORY_PILOTS]:
+                    for suffix in CATEGORY_SUFFIXES:
+                        self._enqueue(f"{base}{suffix}", "nav_discovery", PRIORITY_CATEGORY, (base, suffix))
 
-        except Exception:
-            pass
+        except Exception as e:
+            record_error("homepage", e, self.base_url)
+            self.failures.append("homepage")
+        finally:
+            # No fingerprint is coming; don't keep common-path guessing waiting
+            self._fingerprinted.set()
+
+    def _learn_category_suffix(self, host, suffix):
+        # First suffix that validated on this host unlocks it for all categories
+        if host in self._category_suffix:
+            return
+        self._category_suffix[host] = suffix
+        self._expand_categories(host, suffix)
+
+    def _expand_categories(self, host, suffix):
+        for base in self._categories.get(host, []):
+            self._enqueue(f"{base}{suffix}", "nav_discovery", PRIORITY_CATEGORY, (base, suffix))
 
     async def _guess_common_paths(self, client):
         # Uses the updated list from patterns.py
-        tasks = []
-        for path in COMMON_PATHS:
-            url = urljoin(self.base_url, path)
-            tasks.append(self._validate_and_add(client, url, "common_path"))
-        await asyncio.gather(*tasks)
+        if self.path_stats is not None:
+            # Stats are per platform, so give the homepage a moment to fingerprint
+            try:
+                await asyncio.wait_for(self._fingerprinted.wait(), self.PLATFORM_WAIT)
+            except asyncio.TimeoutError:
+                pass
+        for path in self._planned_paths(COMMON_PATHS):
+            self._enqueue_path(path, "common_path", PRIORITY_COMMON)
+
+    def _planned_paths(self, paths):
+        if self.path_stats is None:
+            return paths
+        return self.path_stats.plan(paths, self.platform)
+
+    def _enqueue_path(self, path, source, priority):
+        url = urljoin(self.base_url, path)
+        self._probe_paths[url] = path
+        self._enqueue(url, source, priority)
+
+    def _record_path(self, url, outcome):
+        # Only real probes count; duplicates, errors and cut-short redirects say nothing about the path
+        path = self._probe_paths.get(url)
+        if path is None or self.path_stats is None or outcome not in ("feed", "sitemap", "miss"):
+            return
+        self.path_stats.record(path, outcome != "miss", self.platform)
 
     async def _parse_robots(self, client):
         try:
-            r = await client.get(urljoin(self.base_url, "/robots.txt"))
+            r = await self._fetch(client, urljoin(self.base_url, "/robots.txt"))
+            if r is None:
+                # No (or a forbidden) robots.txt is normal, not a failure
+                return
             for line in r.text.splitlines():
                 if line.lower().strip().startswith("sitemap:"):
                     sitemap_url = line.split(":", 1)[1].strip()
-                    await self._validate_and_add(client, sitemap_url, "robots")
-        except Exception:
-            pass
+                    self._enqueue(sitemap_url, "robots", PRIORITY_ROBOTS)
+        except Exception as e:
+            record_error("robots", e, self.base_url)
+            self.failures.append("robots")
 
-    async def _validate_and_add(self, client, url, source):
+    async def _validate_and_add(self, client, candidate):
+        url, source = candidate.url, candidate.source
         # Filter out bad patterns (comments, social media) and duplicates
-        clean_url = url.split('?')[0].rstrip('/') # Normalize for comparison
-        
-        if clean_url in self.seen_urls or any(bad in url.lower() for bad in BAD_PATTERNS):
+        key = canonical_url(url)
+
+        if key in self.seen_urls:
+            record_candidate(source, "duplicate", url)
+            return
+        if is_bad_url(url):
+            record_candidate(source, "filtered", url)
             return
-        
-        self.seen_urls.add(clean_url)
+        # Known-dead path on this host (e.g. /rss/all.xml 404'd last run)
+        if self.cache is not None and self.cache.is_dead(key):
+            record_candidate(source, "dead", url)
+            return
+
+        self.seen_urls.add(key)
+        # Redirect targets claimed by this candidate; a 429 retry may walk them again
+        claimed = {key}
 
+        def follow(next_url):
+            if is_bad_url(next_url):
+                return "filtered"
+            next_key = canonical_url(next_url)
+            if next_key in claimed:
+                return None
+            if next_key in self.seen_urls:
+                # Another candidate already fetched (or redirected to) this URL
+                return "duplicate"
+            self.seen_urls.add(next_key)
+            claimed.add(next_key)
+            return None
+
+        # An index we will expand is read to the end in the same fetch
+        max_children = self.max_sitemap_children if candidate.depth < self.max_sitemap_depth else 0
         try:
-            # Check for Feed first (MobiHealthNews / Cultura Colectiva focus)
-            if await validate_feed(client, url):
-                self.results.append({"url": url, "type": "feed", "source": source})
-            # Check for Sitemap second (NewsObserver focus)
-            elif await validate_sitemap(client, url):
-                self.results.append({"url": url, "type": "sitemap", "source": source})
-        except Exception:
-            pass
\ No newline at end of file
+            # One fetch, one parse: the verdict tells us feed vs sitemap
+            started = time.perf_counter()
+            verdict = await self.scheduler.submit(
+                url, classify_url, client, url, SNIFF_BYTES, follow, MAX_REDIRECTS, max_children,
+            )
+            outcome = verdict.category or verdict.stopped or ("error" if verdict.error else "miss")
+            self._probes += 1
+            self._probe_errors += outcome == "error"
+            record_candidate(source, outcome, url, verdict.status_code, time.perf_counter() - started)
+            self._record_path(url, outcome)
+            if self.cache is not None:
+                self.cache.mark_dead(key, verdict.status_code)
+            if verdict.category == "feed":
+                self._add_result({"url": url, "type": "feed", "format": verdict.kind, "source": source})
+                self._learn_from_hit(url, candidate.hint)
+            elif verdict.category == "sitemap":
+                is_index = verdict.kind == "sitemapindex"
+                self._add_result({
+                    "url": url, "type": "sitemap", "format": verdict.kind, "source": source,
+                    "sitemap_kind": "index" if is_index else classify_sitemap(url, verdict.namespaces),
+                })
+                if is_index and max_children:
+                    self._expand_sitemap_index(verdict.children, candidate.depth + 1)
+        except Exception as e:
+            record_error("validate", e, url)
+
+    def _expand_sitemap_index(self, children, depth):
+        # Children join the same queue, so indexes are walked breadth-first and
+        # news/video children are probed before month-by-month archives
+        for child in children:
+            priority = PRIORITY_SITEMAP_ARCHIVE if classify_sitemap(child.loc) == "by_date" else PRIORITY_SITEMAP_CHILD
+            self._enqueue(child.loc, "sitemap_index", priority, depth=depth)
+
+    def _learn_from_hit(self, url, hint):
+        parsed = urlparse(url)
+        if hint is not None:
+            suffix = hint[1]
+        else:
+            # Any other feed hit (/feed, /news/rss.xml, ...) hints at the host's suffix
+            suffix = COMMON_PATH_SUFFIXES.get(parsed.path.rstrip('/').rsplit('/', 1)[-1])
+            if suffix is None:
+                return
+        self._learn_category_suffix(parsed.netloc, suffix)
@@ -0,0 +1,60 @@
+# feed_state.py
+import os
+import sqlite3
+import time
+
+
+class FeedStateStore:
+    """
+    Per-feed state kept between FeedValidator runs: validators for conditional
+    GET (ETag / Last-Modified), a hash of the parsed bytes, and the last
+    extracted link / pub_date so an unchanged feed needs no re-parse.
+    Writes are buffered and committed in batches.
+    """
+
+    def __init__(self, path="feedsdata/feed_state.sqlite3", batch_size=500):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feed_state ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT,"
+            " link TEXT, pub_date TEXT, message TEXT, checked_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, url):
+        row = self._conn.execute(
+            "SELECT etag, last_modified, content_hash, link, pub_date, message"
+            " FROM feed_state WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("etag", "last_modified", "content_hash", "link", "pub_date", "message"), row))
+
+    def put(self, url, etag, last_modified, content_hash, link, pub_date, message):
+        self._pending.append((url, etag, last_modified, content_hash, link, pub_date, message, time.time()))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO feed_state"
+            " (url, etag, last_modified, content_hash, link, pub_date, message, checked_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            self._pending,
+        )
+        self._conn.commit()
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self._conn.close()
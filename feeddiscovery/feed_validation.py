@@ -1,25 +1,220 @@
 import os
 import sys
+import asyncio
+import hashlib
+import httpx
 import requests
 import pandas as pd
 import pytz
 from lxml import etree
-from datetime import datetime
-from dateutil import parser
-from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from contextlib import AsyncExitStack
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse
 from requests.exceptions import RequestException
 
+from .dates import DateParser
+from .feed_state import FeedStateStore
+from .history import COLUMNS, HistoryStore
+from .http_client import build_client
+from .scheduler import RequestScheduler, parse_retry_after
+from .sources import DatabaseSource, source_for_file, stream_urls
+
+
+class FetchResult(NamedTuple):
+    status_code: int
+    content: bytes = b""
+    retry_after: Optional[float] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # Prefix hash to store (None when the answer needed more than the prefix)
+    # and what was extracted (None when the hash matched and nothing was parsed)
+    content_hash: Optional[str] = None
+    extracted: Optional[tuple] = None
+
+
+# A 200 body is hashed on its first HASH_PREFIX bytes, before any parsing, so
+# the hash doesn't depend on how the network chunked it. A matching stored
+# hash skips the parse. Hashes are only stored when those bytes decide the
+# answer (first <item> inside them, or the whole body), so a match is exact.
+HASH_PREFIX = 32 * 1024
+
+
+def hash_prefix(head):
+    return hashlib.sha1(bytes(head[:HASH_PREFIX])).hexdigest()
+
+
+def feed_prefix(extractor, head, whole_body):
+    """
+    Feeds `head` (at least the prefix, or the whole body) to the extractor,
+    prefix first. Returns True when the prefix alone decided the answer.
+    """
+    if extractor.feed(bytes(head[:HASH_PREFIX])) or whole_body:
+        return True
+    extractor.feed(bytes(head[HASH_PREFIX:]))
+    return False
+
+
+# Namespace-agnostic item lookups, compiled once
+_LINK_TEXT = etree.XPath(".//*[local-name()='link']/text() | .//*[local-name()='loc']/text()")
+_LINK_HREF = etree.XPath(".//*[local-name()='link']/@href | .//*[local-name()='loc']/@href")
+# Find Date (Order of preference)
+_DATE_QUERIES = [
+    etree.XPath(f".//*[local-name()='{name}']/text()")
+    for name in ("pubDate", "updated", "published", "date", "lastmod", "publication_date")
+]
+
+
+def _local_name(tag):
+    return tag.split('}', 1)[1] if isinstance(tag, str) and '}' in tag else tag
+
+
+def _item_link_and_date(item):
+    link = _LINK_TEXT(item)
+    if not link: # Try href attribute (common in Atom)
+        link = _LINK_HREF(item)
+    link = link[0] if link else "N/A"
+
+    for query in _DATE_QUERIES:
+        found = query(item)
+        if found:
+            return link, found[0]
+    return link, None
+
+
+# Roots that never hold an <item>/<entry>/<url>: answer "empty" without reading on
+NON_FEED_ROOTS = ("sitemapindex", "html")
+_OLDEST = datetime.min.replace(tzinfo=timezone.utc)
+
+
+class LatestItemExtractor:
+    """
+    Incremental latest-item extraction. Feed it chunks as they arrive:
+    for RSS/Atom it is done at the first complete <item>/<entry>; for a
+    <urlset> it streams every <url> and keeps only the newest lastmod
+    (compared as dates, via `date_parser`). Every completed element outside
+    an item is discarded once read, whatever the root, so memory stays bounded.
+    """
+
+    def __init__(self, date_parser=None):
+        self._parser = etree.XMLPullParser(
+            events=("start", "end"), recover=True, no_network=True, resolve_entities=False,
+        )
+        self._dates = date_parser or DateParser()
+        self._root = None
+        self._started = False
+        self._open_items = 0   # <item>/<entry>/<url> elements still being read
+        self._fallback = None  # first <url> outside a urlset, used only if no item shows up
+        self._newest = None    # (parsed lastmod, lastmod, link) while streaming a urlset
+        self.result = None
+        self.done = False
+
+    def feed(self, chunk):
+        """Returns True once the answer is known and the rest can be skipped."""
+        if self.done:
+            return True
+        if not self._started:
+            # XML declarations must be at the very start
+            chunk = chunk.lstrip()
+            if not chunk:
+                return False
+            self._started = True
+        self._parser.feed(chunk)
+        self._process()
+        return self.done
+
+    def _process(self):
+        for event, element in self._parser.read_events():
+            name = _local_name(element.tag)
+            if event == "start":
+                if self._root is None:
+                    self._root = name
+                    if name in NON_FEED_ROOTS:
+                        self.done = True
+                        return
+                elif name in ("item", "entry", "url"):
+                    self._open_items += 1
+                continue
+
+            if name in ("item", "entry", "url"):
+                self._open_items -= 1
+            if name in ("item", "entry") and self._root != "urlset":
+                link, date_str = _item_link_and_date(element)
+                self.result = (link, date_str, "Success")
+                self.done = True
+                return
+
+            if name == "url":
+                if self._root == "urlset":
+                    link, date_str = _item_link_and_date(element)
+                    key = (self._dates.parse(date_str) or _OLDEST, date_str or "")
+                    if self._newest is None or key > self._newest[0]:
+                        self._newest = (key, link, date_str)
+                elif self._fallback is None:
+                    self._fallback = _item_link_and_date(element)
+
+            if not self._open_items:
+                # Drop what we have read so the tree never grows
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+    def close(self):
+        """Returns (link, pub_date_str, message) like FeedValidator.extract_feed_data."""
+        if not self.done:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                pass
+            self._process()
+        if self.result is not None:
+            return self.result
+        best = self._newest[1:] if self._newest else self._fallback
+        if best is not None:
+            return best[0], best[1], "Success"
+        return None, None, "Feed is empty (no items/entries)"
 
 
 class FeedValidator:
-    def __init__(self):
+    def __init__(self, state_path="feedsdata/feed_state.sqlite3",
+                 history_path="feedsdata/all_feeds_history.sqlite3"):
         self.report_data = []
+        # ETag/Last-Modified + last extracted values per feed; None disables conditional GET
+        self.state_store = FeedStateStore(state_path) if state_path else None
+        self.history_path = history_path
+        self._history = None
         self.tz_ist = pytz.timezone("Asia/Kolkata")
+        # Fast-path date parsing, memoizing the format per feed and per host
+        self.date_parser = DateParser()
         self.session = requests.Session()
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
         }
 
+    def close(self):
+        """Writes any buffered feed state and closes the state/history databases."""
+        if self.state_store is not None:
+            self.state_store.close()
+            self.state_store = None
+        if self._history is not None:
+            self._history.close()
+            self._history = None
+        self.session.close()
+
+    @property
+    def history(self):
+        # Opened on first use so plain checks never touch the history database
+        if self._history is None:
+            self._history = HistoryStore(self.history_path)
+        return self._history
+
+    def domain_source(self, domain_names: list):
+        """
+        Streams source URLs for the given domain names (source JOIN domain),
+        in IN-list batches read with fetchmany().
+        """
+        return DatabaseSource(domain_names, connect=get_msq_conn, close=close_mysql_conn)
+
     def fetch_urls_by_domain_names(self, domain_names: list):
         """
         Queries the source URLs by joining the domain and source tables.
@@ -28,235 +223,339 @@ class FeedValidator:
         if not domain_names:
             return []
 
-        conn, cursor = get_msq_conn()
         feed_urls = []
         try:
-            # JOIN logic: Match source.domain_id with domain.id
-            # We use the 'IN' clause for efficiency instead of looping
-            format_strings = ','.join(['%s'] * len(domain_names))
-            query = f"""
-                SELECT s.url 
-                FROM source s
-                INNER JOIN domain d ON s.domain_id = d.id 
-                WHERE d.name IN ({format_strings}) 
-                AND s.is_deleted = 0
-            """
-            cursor.execute(query, tuple(domain_names))
-            feed_urls = [row[0] for row in cursor.fetchall()]
+            feed_urls = list(self.domain_source(domain_names))
             print(f"Fetched {len(feed_urls)} URLs for {len(domain_names)} domains.")
         except Exception as e:
             print(f"Database error: {e}")
-        finally:
-            close_mysql_conn(db=conn, cursor=cursor)
         
         return feed_urls
     
-    def parse_date_to_ist(self, date_str):
-        """Parse string and convert to IST."""
+    def parse_date_to_ist(self, date_str, keys=()):
+        """Parse string and convert to IST. `keys` (feed URL, host) let the parser reuse a known format."""
         if not date_str:
             return None
         try:
-            dt = parser.parse(str(date_str).strip())
-            if dt.tzinfo is None:
-                dt = pytz.UTC.localize(dt)
-            return dt.astimezone(self.tz_ist)
+            dt = self.date_parser.parse(date_str, keys)
+            return dt.astimezone(self.tz_ist) if dt else None
         except Exception:
             return None
 
+    def get_age_metrics_batch(self, pub_dates):
+        """Calculate time differences for many dates against a single 'now'."""
+        now = datetime.now(self.tz_ist)
+        metrics = []
+        for pub_date in pub_dates:
+            if not pub_date:
+                metrics.append({"days": "N/A", "hours": "N/A", "status_msg": "No Date Found"})
+                continue
+            diff = now - pub_date
+            days = diff.days
+            metrics.append({
+                "days": days,
+                "hours": int(diff.total_seconds() // 3600),
+                "status_msg": "Active" if days < 2 else "Stale" if days < 30 else "Inactive"
+            })
+        return metrics
+
     def get_age_metrics(self, pub_date):
         """Calculate time differences from now."""
-        if not pub_date:
-            return {"days": "N/A", "hours": "N/A", "status_msg": "No Date Found"}
-        
-        now = datetime.now(self.tz_ist)
-        diff = now - pub_date
-        hours = int(diff.total_seconds() // 3600)
-        days = diff.days
-        
-        return {
-            "days": days,
-            "hours": hours,
-            "status_msg": "Active" if days < 2 else "Stale" if days < 30 else "Inactive"
-        }
+        return self.get_age_metrics_batch([pub_date])[0]
+
+    def apply_age_metrics(self, rows):
+        """Fills days_old/hours_old/message on rows from _build_result, one batch at a time."""
+        dated = [row for row in rows if "_pub_dt" in row]
+        ages = self.get_age_metrics_batch([row["_pub_dt"] for row in dated])
+        for row, age in zip(dated, ages):
+            msg = row.pop("_msg")
+            del row["_pub_dt"]
+            row.update({
+                "days_old": age['days'],
+                "hours_old": age['hours'],
+                "message": age['status_msg'] if msg == "Success" else msg
+            })
+        return rows
 
     def extract_feed_data(self, xml_content):
-        """Extracts the latest item info using namespace-agnostic XPaths."""
+        """Extracts the latest item info from a complete document (see LatestItemExtractor)."""
         try:
-            tree = etree.fromstring(xml_content, parser=etree.XMLParser(recover=True, no_network=True))
-            
-            # Common RSS/Atom paths for the 'latest' entry/item
-            # We use local-name() to bypass namespace issues (like 'content:', 'atom:', etc.)
-            items = tree.xpath("//*[local-name()='item'] | //*[local-name()='entry']")
-            if not items:
-                items = tree.xpath("//*[local-name()='url']") 
-                
-            
-            if not items:
-                return None, None, "Feed is empty (no items/entries)"
-
-            latest_item = items[0]
-
-            # Find Link
-            link = latest_item.xpath(".//*[local-name()='link']/text() | .//*[local-name()='loc']/text()")
-            if not link: # Try href attribute (common in Atom)
-                link = latest_item.xpath(".//*[local-name()='link']/@href | .//*[local-name()='loc']/@href")
-            link = link[0] if link else "N/A"
-
-            # Find Date (Order of preference)
-            date_queries = [
-                ".//*[local-name()='pubDate']/text()",
-                ".//*[local-name()='updated']/text()",
-                ".//*[local-name()='published']/text()",
-                ".//*[local-name()='date']/text()",
-                ".//*[local-name()='lastmod']/text()",
-                ".//*[local-name()='publication_date']/text()"
-                
-            ]
-            
-            pub_date_str = None
-            for query in date_queries:
-                found = latest_item.xpath(query)
-                if found:
-                    pub_date_str = found[0]
-                    break
-            
-            return link, pub_date_str, "Success"
-
+            extractor = LatestItemExtractor(self.date_parser)
+            extractor.feed(xml_content)
+            return extractor.close()
         except Exception as e:
             return None, None, f"Parsing Error: {str(e)}"
         
-    def start_check(self, domain_names: list = None, excel_file: str = None, max_workers=10):
+    def _build_result(self, feed_url, link, date_str, msg):
         """
-        Starts the validation process. Can take a list of domain names OR an excel file.
+        Turns extracted feed data into a report row. Rows with a date carry
+        private _pub_dt/_msg fields until apply_age_metrics fills in the ages.
         """
-        feed_urls = []
-
-        # 1. Fetch from Database if domain names are provided
-        if domain_names:
-            feed_urls.extend(self.fetch_urls_by_domain_names(domain_names))
-
-        # 2. Fetch from Excel if file provided
-        if excel_file and os.path.exists(excel_file):
-            data = pd.read_excel(excel_file)
-            if 'url' in data.columns:
-                feed_urls.extend(data['url'].dropna().tolist())
-
-        if not feed_urls:
-            print("No URLs found to check.")
-            return
-
-        # Process feeds in parallel
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            executor.map(self.check_url, list(set(feed_urls))) # use set() to avoid duplicates
+        result = {
+            "feed_url": feed_url,
+            "link": link,
+            "pub_date": "N/A",
+            "days_old": "N/A",
+            "hours_old": "N/A",
+            "status": "Success",
+            "message": msg
+        }
 
-        self.generate_report("feed_report_final.xlsx")
+        if date_str:
+            dt_obj = self.parse_date_to_ist(date_str, keys=(feed_url, urlparse(feed_url).netloc))
+            result.update({
+                "pub_date": dt_obj.strftime('%Y-%m-%d %H:%M:%S') if dt_obj else date_str,
+                "_pub_dt": dt_obj,
+                "_msg": msg,
+            })
+        else:
+            result["message"] = msg or "No date found in XML"
 
+        return result
 
-    def check_url(self, feed_url):
-        """Worker function to fetch and process a single URL."""
-        result = {
+    def _failure_result(self, feed_url, message):
+        return {
             "feed_url": feed_url,
             "link": "N/A",
             "pub_date": "N/A",
             "days_old": "N/A",
             "hours_old": "N/A",
             "status": "Failure",
-            "message": ""
+            "message": message
         }
 
+    def _conditional_headers(self, state):
+        headers = dict(self.headers)
+        if state:
+            if state["etag"]:
+                headers["If-None-Match"] = state["etag"]
+            if state["last_modified"]:
+                headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def _extract_body(self, fetched, state):
+        """Prefix hash check and extraction for a body already in memory (check_url)."""
+        content_hash = hash_prefix(fetched.content)
+        if state and state["content_hash"] == content_hash:
+            return fetched._replace(content_hash=content_hash)
+        extractor = LatestItemExtractor(self.date_parser)
         try:
-            response = self.session.get(feed_url, headers=self.headers, timeout=15, verify=True)
-            
-            if response.status_code == 200:
-                link, date_str, msg = self.extract_feed_data(response.content)
-                result["status"] = "Success"
-                result["link"] = link
-                result["message"] = msg
-                if date_str:
-
-                    dt_obj = self.parse_date_to_ist(date_str)
-                    age = self.get_age_metrics(dt_obj)
-                    
-                    result.update({
-                        "link": link,
-                        "pub_date": dt_obj.strftime('%Y-%m-%d %H:%M:%S') if dt_obj else date_str,
-                        "days_old": age['days'],
-                        "hours_old": age['hours'],
-                        "status": "Success",
-                        "message": age['status_msg'] if msg == "Success" else msg
-                    })
-                else:
-                    result["message"] = msg or "No date found in XML"
+            decided = feed_prefix(extractor, fetched.content, len(fetched.content) <= HASH_PREFIX)
+            extracted = extractor.close()
+        except Exception as e:
+            decided, extracted = False, (None, None, f"Parsing Error: {str(e)}")
+        return fetched._replace(content_hash=content_hash if decided else None, extracted=extracted)
+
+    def _process_response(self, feed_url, fetched, state=None):
+        """
+        Builds the row for one response. A 304, or a body whose prefix hash
+        matched the stored one (extracted is None), reuses the last extracted
+        link/pub_date without parsing.
+        """
+        if fetched.status_code == 304 and state:
+            link, date_str, msg = state["link"], state["pub_date"], state["message"]
+        elif fetched.status_code == 200:
+            if fetched.extracted is None:
+                link, date_str, msg = state["link"], state["pub_date"], state["message"]
             else:
-                result["message"] = f"HTTP {response.status_code}"
+                link, date_str, msg = fetched.extracted
+            if self.state_store is not None:
+                self.state_store.put(
+                    feed_url, fetched.etag, fetched.last_modified, fetched.content_hash, link, date_str, msg
+                )
+        else:
+            return self._failure_result(feed_url, f"HTTP {fetched.status_code}")
+
+        return self._build_result(feed_url, link, date_str, msg)
 
+    def check_url(self, feed_url):
+        """Checks a single URL synchronously (ad-hoc use; bulk runs go through check_urls_async)."""
+        state = self.state_store.get(feed_url) if self.state_store else None
+        try:
+            response = self.session.get(feed_url, headers=self._conditional_headers(state), timeout=15, verify=True)
+            fetched = FetchResult(
+                response.status_code, response.content,
+                etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"),
+            )
+            if fetched.status_code == 200:
+                fetched = self._extract_body(fetched, state)
+            result = self._process_response(feed_url, fetched, state)
         except RequestException as e:
-            result["message"] = f"Network Error: {type(e).__name__}"
+            result = self._failure_result(feed_url, f"Network Error: {type(e).__name__}")
         except Exception as e:
-            result["message"] = f"Unexpected Error: {str(e)}"
+            result = self._failure_result(feed_url, f"Unexpected Error: {str(e)}")
 
+        if self.state_store is not None:
+            # Ad-hoc checks have no end-of-run flush, so persist the validators now
+            self.state_store.flush()
+        self.apply_age_metrics([result])
         self.report_data.append(result)
+        return result
+
+    async def _fetch_async(self, client, feed_url, state):
+        # Stream the body into the extractor and hang up as soon as it has the answer
+        async with client.stream("GET", feed_url, headers=self._conditional_headers(state)) as r:
+            fetched = FetchResult(
+                r.status_code, retry_after=parse_retry_after(r.headers.get("Retry-After")),
+                etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified"),
+            )
+            if r.status_code != 200:
+                return fetched
+
+            chunks = r.aiter_bytes()
+            head = bytearray()
+            whole_body = True
+            async for chunk in chunks:
+                head += chunk
+                if len(head) > HASH_PREFIX:
+                    whole_body = False
+                    break
+            content_hash = hash_prefix(head)
+            if state and state["content_hash"] == content_hash:
+                return fetched._replace(content_hash=content_hash)
+
+            extractor = LatestItemExtractor(self.date_parser)
+            try:
+                decided = feed_prefix(extractor, head, whole_body)
+                if not (decided or extractor.done):
+                    async for chunk in chunks:
+                        if extractor.feed(chunk):
+                            break
+                extracted = extractor.close()
+            except Exception as e:
+                decided, extracted = False, (None, None, f"Parsing Error: {str(e)}")
+
+        return fetched._replace(content_hash=content_hash if decided else None, extracted=extracted)
+
+    async def check_url_async(self, client, scheduler, feed_url):
+        """Async worker: conditional fetch through the scheduler (per-host limits, 429 backoff)."""
+        state = self.state_store.get(feed_url) if self.state_store else None
+        try:
+            fetched = await scheduler.submit(feed_url, self._fetch_async, client, feed_url, state)
+            return self._process_response(feed_url, fetched, state)
+        except httpx.HTTPError as e:
+            return self._failure_result(feed_url, f"Network Error: {type(e).__name__}")
+        except Exception as e:
+            return self._failure_result(feed_url, f"Unexpected Error: {str(e)}")
 
-    def start_check(self, domain_names: list = None, excel_file: str = None, max_workers=10):
+    async def check_urls_async(self, feed_urls, concurrency=500, per_host=4, per_host_rate=5.0,
+                               global_rate=None, client=None):
         """
-        Starts the validation process. Can take a list of domain names OR an excel file.
+        Checks many feeds on one pooled httpx.AsyncClient. `feed_urls` may be
+        any iterable or async iterable (see sources.stream_urls); it is consumed
+        lazily through a bounded queue.
+        `concurrency` caps in-flight requests overall, `per_host`/`per_host_rate`
+        keep us polite to each publisher and `global_rate` (req/s) caps the total.
+        Rows are handed to a single collector over an asyncio.Queue, so
+        self.report_data is only ever touched from the event loop.
+        Pass `client` to reuse an existing pool (e.g. the API's shared client).
         """
-        feed_urls = []
+        scheduler = RequestScheduler(
+            max_concurrency=concurrency, per_host=per_host,
+            rate=per_host_rate, burst=per_host, global_rate=global_rate,
+        )
+        pending = asyncio.Queue(maxsize=concurrency * 2)
+        results = asyncio.Queue()
+
+        async def producer():
+            if hasattr(feed_urls, "__aiter__"):
+                async for url in feed_urls:
+                    await pending.put(url)
+            else:
+                for url in feed_urls:
+                    await pending.put(url)
+            for _ in range(concurrency):
+                await pending.put(None)
+
+        async def worker(client):
+            while True:
+                url = await pending.get()
+                if url is None:
+                    return
+                await results.put(await self.check_url_async(client, scheduler, url))
+
+        async def collector(batch_size=1000):
+            # Ages are computed per batch of rows rather than one row at a time
+            batch = []
+            while True:
+                row = await results.get()
+                if row is not None:
+                    batch.append(row)
+                if batch and (row is None or len(batch) >= batch_size):
+                    self.report_data.extend(self.apply_age_metrics(batch))
+                    batch = []
+                if row is None:
+                    return
+
+        async with AsyncExitStack() as stack:
+            # An injected client belongs to the caller; only close the one we build
+            if client is None:
+                client = await stack.enter_async_context(build_client(
+                    timeout=15,
+                    max_connections=concurrency,
+                    max_keepalive_connections=concurrency,
+                    headers=self.headers,
+                ))
+            collecting = asyncio.create_task(collector())
+            await asyncio.gather(producer(), *(worker(client) for _ in range(concurrency)))
+            await results.put(None)
+            await collecting
+
+        if self.state_store is not None:
+            self.state_store.flush()
+
+    def start_check(self, domain_names: list = None, excel_file: str = None, sources: list = None,
+                    concurrency=500, per_host=4, per_host_rate=5.0, global_rate=None):
+        """
+        Starts the validation process. Can take a list of domain names, a URL
+        file (.xlsx/.csv/.jsonl with a 'url' column) and/or any UrlSource.
+        URLs stream in chunks and checking starts on the first one.
+        """
+        sources = list(sources or [])
 
         # 1. Fetch from Database if domain names are provided
         if domain_names:
-            feed_urls.extend(self.fetch_urls_by_domain_names(domain_names))
+            sources.append(self.domain_source(domain_names))
 
-        # 2. Fetch from Excel if file provided
+        # 2. Fetch from a URL file if provided
         if excel_file and os.path.exists(excel_file):
-            data = pd.read_excel(excel_file)
-            if 'url' in data.columns:
-                feed_urls.extend(data['url'].dropna().tolist())
+            sources.append(source_for_file(excel_file))
 
-        if not feed_urls:
+        if not sources:
             print("No URLs found to check.")
             return
 
-        # Process feeds in parallel
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            executor.map(self.check_url, list(set(feed_urls))) # use set() to avoid duplicates        
+        before = len(self.report_data)
+        # Duplicates are dropped by a fixed-size Bloom filter inside stream_urls
+        asyncio.run(self.check_urls_async(
+            stream_urls(sources), concurrency=concurrency, per_host=per_host,
+            per_host_rate=per_host_rate, global_rate=global_rate,
+        ))
+        if len(self.report_data) == before:
+            print("No URLs found to check.")
 
     def export_to_excel(self, filename="feed_validation_report.xlsx"):
         df = pd.DataFrame(self.report_data)
         # Reorder columns for readability
-        cols = ["status", "feed_url", "days_old", "hours_old", "pub_date", "link", "message"]
-        df = df[cols]
+        df = df[COLUMNS]
         df.to_excel(filename, index=False)
         print(f"Report saved to {filename}")
         
-    def update_master_report(self, filename="all_feeds_history",api_info=None):
-        # 1. Convert current run data to DataFrame
-        new_df = pd.DataFrame(self.report_data)
-        cols = ["status", "feed_url", "days_old", "hours_old", "pub_date", "link", "message"]
-        new_df = new_df[cols]
-
-        # 2. Check if the master file already exists
-        if os.path.exists(filename):
-            # Read the existing data
-            existing_df = pd.read_excel(filename)
-
-            # Combine existing and new data
-            # We put new_df second so that 'keep="last"' preserves the newest check
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        else:
-            combined_df = new_df
-
-        # 3. Remove duplicates
-        # Use 'link' as the unique key. If 'link' is the same, it's a duplicate.
-        # keep='last' ensures that if a feed was checked twice, we keep the most recent result.
-
-        combined_df.drop_duplicates(subset=["feed_url"], keep="last", inplace=True)
-
-        # 4. Save back to Excel
-        api_df = pd.DataFrame([api_info])
-        combined_df = pd.concat([combined_df,api_df],ignore_index=True)
-        combined_df.to_excel(filename, index=False)
-        print(f"Master report updated (duplicates removed). Total records: {len(combined_df)}")
+    def update_master_report(self, filename=None, api_info=None):
+        """
+        Records this run in the history store: appended to the run log and
+        upserted by feed_url, so the cost is O(this run) rather than O(history).
+        Pass `filename` to also write the Excel view (streamed from the store).
+        """
+        run_id = self.history.record_run(self.report_data, api_info=api_info)
+        print(f"Master history updated (run {run_id}). Total feeds: {self.history.count()}")
+        if filename:
+            self.export_master_report(filename)
+
+    def export_master_report(self, filename="feedsdata/all_feeds_history.xlsx"):
+        """On-demand Excel view of the latest result per feed."""
+        self.history.export_excel(filename)
+        print(f"Master report exported to {filename}")
     
     def check_with_newsdataApi(self,domain_name):
         
@@ -281,7 +580,7 @@ class FeedValidator:
         # Save the report for JUST this run
         self.export_to_excel(f"feedsdata/feed_report_of_{domains_name[0]}.xlsx")
 
-        # Update the master history file (appends and cleans)
+        # Update the master history (append-only run log + upsert by feed_url)
         data = self.check_with_newsdataApi(domain_name=domains_name[0])
         print(data)
-        self.update_master_report("feedsdata/all_feeds_history.xlsx",api_info=data)
+        self.update_master_report(api_info=data)
@@ -0,0 +1,107 @@
+# history.py
+import csv
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+# Report columns, in the order the Excel reports have always used
+COLUMNS = ["status", "feed_url", "days_old", "hours_old", "pub_date", "link", "message"]
+
+
+class HistoryStore:
+    """
+    Feed check history in SQLite.
+
+    - `feeds`: latest result per feed_url (upserted, so a run costs O(run), not O(history))
+    - `run_log`: every row of every run, append-only
+    - `runs`: one row per run, with the newsdata API info
+
+    Excel/CSV are views produced on demand by streaming over a cursor.
+    """
+
+    def __init__(self, path="feedsdata/all_feeds_history.sqlite3"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{c} {'TEXT PRIMARY KEY' if c == 'feed_url' else ''}" for c in COLUMNS)
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT NOT NULL,
+                label TEXT,
+                api_info TEXT
+            );
+            CREATE TABLE IF NOT EXISTS feeds ({columns}, run_id INTEGER, checked_at TEXT);
+            CREATE TABLE IF NOT EXISTS run_log (run_id INTEGER NOT NULL, {", ".join(COLUMNS)});
+            CREATE INDEX IF NOT EXISTS run_log_run ON run_log (run_id);
+        """)
+        self._conn.commit()
+
+    def record_run(self, rows, api_info=None, label=None):
+        """Appends a run to the log and upserts each feed's latest result. Returns the run id."""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._conn:
+            run_id = self._conn.execute(
+                "INSERT INTO runs (started_at, label, api_info) VALUES (?, ?, ?)",
+                (now, label, json.dumps(api_info) if api_info is not None else None),
+            ).lastrowid
+            values = [tuple(row.get(c) for c in COLUMNS) for row in rows]
+            placeholders = ", ".join("?" * len(COLUMNS))
+            self._conn.executemany(
+                f"INSERT INTO run_log (run_id, {', '.join(COLUMNS)}) VALUES (?, {placeholders})",
+                ((run_id, *v) for v in values),
+            )
+            updates = ", ".join(f"{c} = excluded.{c}" for c in COLUMNS if c != "feed_url")
+            self._conn.executemany(
+                f"INSERT INTO feeds ({', '.join(COLUMNS)}, run_id, checked_at) VALUES ({placeholders}, ?, ?)"
+                f" ON CONFLICT(feed_url) DO UPDATE SET {updates},"
+                " run_id = excluded.run_id, checked_at = excluded.checked_at",
+                ((*v, run_id, now) for v in values),
+            )
+        return run_id
+
+    def count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM feeds").fetchone()[0]
+
+    def iter_latest(self, batch_size=5000):
+        """Yields the latest row per feed as tuples in COLUMNS order."""
+        cursor = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM feeds ORDER BY feed_url")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+
+    def iter_runs(self):
+        yield from self._conn.execute("SELECT run_id, started_at, label, api_info FROM runs ORDER BY run_id")
+
+    def export_excel(self, filename):
+        """Streams the latest-per-feed view into an .xlsx (write-only workbook, constant memory)."""
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        feeds = workbook.create_sheet("feeds")
+        feeds.append(COLUMNS)
+        for row in self.iter_latest():
+            feeds.append(list(row))
+        runs = workbook.create_sheet("runs")
+        runs.append(["run_id", "started_at", "label", "api_info"])
+        for row in self.iter_runs():
+            runs.append(list(row))
+        workbook.save(filename)
+        return filename
+
+    def export_csv(self, filename):
+        with open(filename, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(COLUMNS)
+            writer.writerows(self.iter_latest())
+        return filename
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,161 @@
+# http_client.py
+import asyncio
+import importlib.util
+import ipaddress
+import socket
+import time
+from itertools import chain, zip_longest
+
+import httpcore
+import httpx
+
+from .metrics import DNS_LOOKUPS, HTTP_PHASE_SECONDS, trace_request, trace_response
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Happy eyeballs (RFC 8305): head start each address gets before the next one is tried
+CONNECT_STAGGER = 0.25
+
+
+def interleave_families(addresses):
+    """Alternates IPv6 and IPv4 addresses, keeping the resolver's first family first."""
+    v6 = [a for a in addresses if ":" in a]
+    v4 = [a for a in addresses if ":" not in a]
+    first, second = (v6, v4) if addresses and ":" in addresses[0] else (v4, v6)
+    return [a for a in chain.from_iterable(zip_longest(first, second)) if a is not None]
+
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """
+    httpcore network backend that caches getaddrinfo results for `ttl` seconds.
+    TLS still uses the original hostname for SNI, so connecting by IP is safe.
+    Connecting by IP turns off anyio's own happy eyeballs, so connect_tcp
+    races the addresses itself: families interleaved, the next attempt
+    started every `stagger` seconds (or as soon as one fails), first wins.
+    """
+
+    def __init__(self, ttl=300.0, max_entries=4096, backend=None, stagger=CONNECT_STAGGER):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stagger = stagger
+        self._backend = backend or httpcore.AnyIOBackend()
+        self._cache = {}  # host -> (expires_at, [ip, ...])
+
+    async def resolve(self, host, port):
+        now = time.monotonic()
+        hit = self._cache.get(host)
+        if hit and hit[0] > now:
+            DNS_LOOKUPS.inc(result="hit")
+            return hit[1]
+
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError:
+            DNS_LOOKUPS.inc(result="error")
+            raise
+        finally:
+            # httpcore's connect phase includes this lookup; dns is also timed on its own
+            HTTP_PHASE_SECONDS.observe(time.monotonic() - now, phase="dns")
+        DNS_LOOKUPS.inc(result="miss")
+        addresses = interleave_families(list(dict.fromkeys(info[4][0] for info in infos)))
+
+        if len(self._cache) >= self.max_entries:
+            self._cache.clear()
+        self._cache[host] = (now + self.ttl, addresses)
+        return addresses
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            ipaddress.ip_address(host)
+            addresses = [host]
+        except ValueError:
+            try:
+                addresses = await self.resolve(host, port)
+            except OSError as exc:
+                raise httpcore.ConnectError(str(exc)) from exc
+
+        kwargs = {"timeout": timeout, "local_address": local_address, "socket_options": socket_options}
+        try:
+            return await self._connect_first(addresses, port, kwargs)
+        except (httpcore.ConnectError, httpcore.ConnectTimeout):
+            # Every cached address failed; forget them so the next attempt re-resolves
+            self._cache.pop(host, None)
+            raise
+
+    async def _connect_first(self, addresses, port, kwargs):
+        if len(addresses) == 1:
+            return await self._backend.connect_tcp(addresses[0], port, **kwargs)
+        waiting = list(addresses)
+        attempts = set()
+        last_exc = None
+        try:
+            while waiting or attempts:
+                if waiting:
+                    attempts.add(asyncio.ensure_future(self._backend.connect_tcp(waiting.pop(0), port, **kwargs)))
+                done, attempts = await asyncio.wait(
+                    attempts, timeout=self.stagger if waiting else None, return_when=asyncio.FIRST_COMPLETED,
+                )
+                for attempt in done:
+                    exc = attempt.exception()
+                    if exc is None:
+                        # Another attempt may have connected in the same step; it is closed below
+                        attempts.update(done - {attempt})
+                        return attempt.result()
+                    if not isinstance(exc, (httpcore.ConnectError, httpcore.ConnectTimeout)):
+                        raise exc
+                    last_exc = exc
+            raise last_exc
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            for outcome in await asyncio.gather(*attempts, return_exceptions=True):
+                if isinstance(outcome, httpcore.AsyncNetworkStream):
+                    await outcome.aclose()
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
+
+
+def build_client(
+    timeout=15,
+    max_connections=200,
+    max_keepalive_connections=50,
+    keepalive_expiry=30.0,
+    http2=False,
+    dns_cache_ttl=300.0,
+    headers=None,
+    transport=None,
+):
+    """
+    Builds the pooled AsyncClient shared by discovery runs.
+    HTTP/2 is only enabled when the optional `h2` package is installed
+    (pip install "httpx[http2]"); otherwise the client falls back to HTTP/1.1.
+    Pass `transport` to replace the pooled transport (e.g. the benchmarks'
+    local publisher simulator); the limits and DNS cache then don't apply.
+    """
+    if http2 and importlib.util.find_spec("h2") is None:
+        http2 = False
+
+    if transport is None:
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+        if dns_cache_ttl:
+            # httpx does not expose the network backend, so swap it on the pool directly
+            transport._pool._network_backend = CachingDNSBackend(ttl=dns_cache_ttl)
+
+    # follow_redirects=True is vital for Cultura Colectiva and NewsObserver
+    return httpx.AsyncClient(
+        timeout=timeout,
+        headers=headers or {"User-Agent": USER_AGENT},
+        follow_redirects=True,
+        transport=transport,
+        # Per-phase timings and status counts (see metrics.py)
+        event_hooks={"request": [trace_request], "response": [trace_response]},
+    )
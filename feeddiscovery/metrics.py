@@ -0,0 +1,325 @@
+# metrics.py
+"""
+Prometheus-style metrics (text exposition via REGISTRY.render(), served at
+/metrics) and an optional per-discovery trace.
+
+Request phases come from httpcore's `trace` extension, attached to every
+request by the `trace_request` event hook in http_client.build_client.
+"""
+import asyncio
+import bisect
+import contextvars
+import threading
+import time
+from collections import Counter as _Tally, deque
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labels, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0.0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def value(self, **labels):
+        counts, total = self._values.get(self._key(labels), ((), 0.0))
+        return {"count": sum(counts), "sum": total}
+
+    def samples(self):
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", bound)])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+# -------------------------------
+# What we measure
+# -------------------------------
+HTTP_RESPONSES = Counter("feed_http_responses_total", "HTTP responses by status class", ["status"])
+HTTP_PHASE_SECONDS = Histogram(
+    "feed_http_phase_seconds", "Time per request phase (dns, connect, tls, send, ttfb, body)", ["phase"],
+)
+DNS_LOOKUPS = Counter("feed_dns_lookups_total", "Resolver lookups by result (hit, miss, error)", ["result"])
+CANDIDATES = Counter(
+    "feed_candidates_total",
+    "Discovery candidates by strategy and outcome (feed, sitemap, miss, error, duplicate, filtered, dead)",
+    ["strategy", "outcome"],
+)
+ERRORS = Counter("feed_errors_total", "Exceptions caught during discovery, by where and type", ["where", "type"])
+PARSE_SECONDS = Histogram("feed_parse_seconds", "Document parse time by mode (inline, offloaded)", ["mode"])
+DISCOVERY_SECONDS = Histogram(
+    "feed_discovery_seconds", "Discovery run time by outcome (complete, deadline, condition, errors, cancelled)", ["outcome"],
+)
+INFLIGHT_REQUESTS = Gauge("feed_inflight_requests", "Requests holding a scheduler slot")
+INFLIGHT_DISCOVERIES = Gauge("feed_inflight_discoveries", "Discoveries currently running")
+BACKOFFS = Counter("feed_scheduler_backoffs_total", "Origins backed off after 429/503")
+LOOP_LAG_SECONDS = Histogram("feed_event_loop_lag_seconds", "Event-loop lag samples", buckets=LAG_BUCKETS)
+
+
+# -------------------------------
+# Per-discovery trace
+# -------------------------------
+# Set by AsyncFeedDiscovery in its own tasks, so the httpx hook and the error
+# helpers know which discovery (if any) a request or failure belongs to
+CURRENT_TRACE = contextvars.ContextVar("feed_discovery_trace", default=None)
+
+
+class DiscoveryTrace:
+    """Everything one discovery did: requests with phase timings, candidates, errors."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = []
+        self.candidates = []
+        self.errors = []
+
+    def _at(self):
+        return round(time.perf_counter() - self.started, 4)
+
+    def start_request(self, url):
+        record = {"url": url, "at": self._at(), "status": None, "phases": {}}
+        self.requests.append(record)
+        return record
+
+    def strategies(self):
+        """Per-strategy probes (fetched candidates) and hits."""
+        probes, hits = _Tally(), _Tally()
+        for candidate in self.candidates:
+            if candidate["outcome"] in ("feed", "sitemap", "miss", "error"):
+                probes[candidate["source"]] += 1
+            if candidate["outcome"] in ("feed", "sitemap"):
+                hits[candidate["source"]] += 1
+        return {
+            source: {"probes": probes[source], "hits": hits[source], "hit_rate": round(hits[source] / probes[source], 3)}
+            for source in probes
+        }
+
+    def as_dict(self):
+        phases = {}
+        for request in self.requests:
+            for phase, seconds in request["phases"].items():
+                phases[phase] = round(phases.get(phase, 0.0) + seconds, 4)
+        return {
+            "elapsed": self._at(),
+            "requests": len(self.requests),
+            "phase_totals": phases,
+            "strategies": self.strategies(),
+            "errors": self.errors,
+            "candidates": self.candidates,
+            "request_log": self.requests,
+        }
+
+
+def record_candidate(source, outcome, url, status=None, elapsed=None):
+    CANDIDATES.inc(strategy=source, outcome=outcome)
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        trace.candidates.append({
+            "url": url, "source": source, "outcome": outcome, "status": status,
+            "elapsed": None if elapsed is None else round(elapsed, 4),
+        })
+
+
+def record_error(where, exc, url=None):
+    """Counts an exception we recover from instead of silently dropping it."""
+    ERRORS.inc(where=where, type=type(exc).__name__)
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        trace.errors.append({"where": where, "type": type(exc).__name__, "message": str(exc)[:200], "url": url})
+
+
+# -------------------------------
+# httpx hooks: per-phase timings
+# -------------------------------
+# httpcore trace event (without its http11./http2./connection. prefix) -> phase
+HTTP_PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send",
+    "receive_response_headers": "ttfb",
+    "receive_response_body": "body",
+}
+
+
+class RequestTrace:
+    """httpcore `trace` extension callback for one request."""
+
+    def __init__(self, record=None):
+        self.record = record
+        self._starts = {}
+
+    async def __call__(self, event, info):
+        name, _, state = event.rpartition(".")
+        phase = HTTP_PHASES.get(name.rsplit(".", 1)[-1])
+        if phase is None:
+            return
+        now = time.perf_counter()
+        if state == "started":
+            self._starts[phase] = now
+            return
+        # "failed" is still timed: a streamed body ends that way when we hang up early
+        elapsed = now - self._starts.pop(phase, now)
+        HTTP_PHASE_SECONDS.observe(elapsed, phase=phase)
+        if self.record is not None:
+            self.record["phases"][phase] = round(self.record["phases"].get(phase, 0.0) + elapsed, 4)
+
+
+async def trace_request(request):
+    """httpx `request` event hook."""
+    trace = CURRENT_TRACE.get()
+    record = trace.start_request(str(request.url)) if trace is not None else None
+    request.extensions["trace"] = RequestTrace(record)
+
+
+async def trace_response(response):
+    """httpx `response` event hook."""
+    HTTP_RESPONSES.inc(status=f"{response.status_code // 100}xx")
+    tracer = response.request.extensions.get("trace")
+    if isinstance(tracer, RequestTrace) and tracer.record is not None:
+        tracer.record["status"] = response.status_code
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic sleep wakes up. Anything
+    blocking the loop (a big parse, sync I/O) shows up directly here.
+    """
+
+    def __init__(self, interval=0.1, window=600):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def snapshot(self):
+        """Lag percentiles in milliseconds over the recent window."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+        return {
+            "samples": len(ordered),
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "window_max_ms": round(ordered[-1] * 1000, 3),
+            "max_ms": round(self.max_lag * 1000, 3),
+        }
@@ -0,0 +1,59 @@
+# parsing.py
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .metrics import PARSE_SECONDS
+
+# Below this many bytes a parse is cheaper than the executor round trip
+DEFAULT_THRESHOLD = 64 * 1024
+
+
+class ParseExecutor:
+    """
+    Runs CPU-bound parsing off the event loop once documents are large.
+
+    kind="thread"  -> ThreadPoolExecutor (lxml releases the GIL while parsing)
+    kind="process" -> ProcessPoolExecutor (func and its result must be picklable)
+    kind="inline"  -> always parse on the loop
+    """
+
+    def __init__(self, kind="thread", max_workers=None, threshold=DEFAULT_THRESHOLD):
+        self.kind = kind
+        self.threshold = threshold
+        if kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="parse")
+        elif kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        elif kind == "inline":
+            self._executor = None
+        else:
+            raise ValueError(f"Unknown parse executor kind: {kind!r}")
+        self.stats = {"inline": 0, "offloaded": 0, "inline_seconds": 0.0, "offloaded_bytes": 0}
+
+    async def run(self, func, data, *args):
+        """Calls func(data, *args), in the executor when len(data) >= threshold."""
+        started = time.perf_counter()
+        if self._executor is None or len(data) < self.threshold:
+            try:
+                return func(data, *args)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.stats["inline"] += 1
+                self.stats["inline_seconds"] += elapsed
+                PARSE_SECONDS.observe(elapsed, mode="inline")
+        self.stats["offloaded"] += 1
+        self.stats["offloaded_bytes"] += len(data)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, data, *args)
+        finally:
+            # Includes time queued for a worker
+            PARSE_SECONDS.observe(time.perf_counter() - started, mode="offloaded")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+# Shared fallback for callers that don't configure one
+INLINE = ParseExecutor("inline")
@@ -0,0 +1,122 @@
+# path_stats.py
+import os
+import random
+import sqlite3
+import time
+
+# Stats rows for "no platform detected"; the global rate sums every platform
+ANY_PLATFORM = ""
+
+
+class PathStats:
+    """
+    Hit statistics per (platform, path) for guessed candidates (COMMON_PATHS
+    and CMS_PATHS), kept across runs so each new domain probes the paths
+    that actually pay off first.
+
+    Rates are smoothed towards `prior_rate` (weight `prior_weight` probes),
+    so new paths are neither trusted nor written off on a handful of probes.
+    A path is skipped once its rate is below `threshold` after `min_probes`
+    probes, except for an `explore` fraction of domains that still try it
+    so the numbers keep tracking reality. Platform-specific stats are used
+    once they have `min_probes`, the global (all-platform) ones before that.
+    Writes are buffered and committed every `batch_size` records or
+    `flush_interval` seconds, whichever comes first.
+    """
+
+    def __init__(self, path="feedsdata/path_stats.sqlite3", threshold=0.01, min_probes=100,
+                 explore=0.1, prior_rate=0.1, prior_weight=10, batch_size=200, flush_interval=30.0,
+                 rng=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.min_probes = min_probes
+        self.explore = explore
+        self.prior_rate = prior_rate
+        self.prior_weight = prior_weight
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rng = rng or random.Random()
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS path_stats ("
+            " platform TEXT NOT NULL, path TEXT NOT NULL, probes INTEGER NOT NULL, hits INTEGER NOT NULL,"
+            " PRIMARY KEY (platform, path))"
+        )
+        self._conn.commit()
+        # Small table (paths x platforms), so it is read once and kept in memory
+        self._stats = {}
+        self._global = {}
+        for platform, path_, probes, hits in self._conn.execute("SELECT platform, path, probes, hits FROM path_stats"):
+            self._add(self._stats, (platform, path_), probes, hits)
+            self._add(self._global, path_, probes, hits)
+        # Deltas per (platform, path), and how many records they hold
+        self._pending = {}
+        self._pending_records = 0
+        self._flushed_at = time.monotonic()
+
+    @staticmethod
+    def _add(table, key, probes, hits):
+        counts = table.setdefault(key, [0, 0])
+        counts[0] += probes
+        counts[1] += hits
+
+    def counts(self, path, platform=None):
+        """(probes, hits) for the platform when it has enough data, else across all platforms."""
+        probes, hits = self._stats.get((platform or ANY_PLATFORM, path), (0, 0))
+        if probes >= self.min_probes:
+            return probes, hits
+        return tuple(self._global.get(path, (0, 0)))
+
+    def rate(self, path, platform=None):
+        probes, hits = self.counts(path, platform)
+        return (hits + self.prior_rate * self.prior_weight) / (probes + self.prior_weight)
+
+    def plan(self, paths, platform=None):
+        """
+        Orders `paths` by smoothed hit rate, best first, dropping proven
+        duds unless this domain was picked to explore them (those go last).
+        """
+        ranked = sorted(paths, key=lambda p: self.rate(p, platform), reverse=True)
+        keep, explore = [], []
+        for path in ranked:
+            probes, _hits = self.counts(path, platform)
+            if probes >= self.min_probes and self.rate(path, platform) < self.threshold:
+                if self.rng.random() < self.explore:
+                    explore.append(path)
+                continue
+            keep.append(path)
+        return keep + explore
+
+    def record(self, path, hit, platform=None):
+        key = (platform or ANY_PLATFORM, path)
+        self._add(self._stats, key, 1, int(hit))
+        self._add(self._global, path, 1, int(hit))
+        self._add(self._pending, key, 1, int(hit))
+        self._pending_records += 1
+        # _pending has at most paths x platforms keys, so count records, not keys
+        if (self._pending_records >= self.batch_size
+                or time.monotonic() - self._flushed_at >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._pending:
+            return
+        self._conn.executemany(
+            "INSERT INTO path_stats (platform, path, probes, hits) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(platform, path) DO UPDATE SET"
+            " probes = probes + excluded.probes, hits = hits + excluded.hits",
+            ((platform, path, probes, hits) for (platform, path), (probes, hits) in self._pending.items()),
+        )
+        self._conn.commit()
+        self._pending = {}
+        self._pending_records = 0
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -24,4 +24,20 @@ BAD_PATTERNS = [
     'instagram.com'
 ]
 
-COMMON_PATHS = FEED_PATTERNS + SITEMAP_PATTERNS
\ No newline at end of file
+COMMON_PATHS = FEED_PATTERNS + SITEMAP_PATTERNS
+
+# Platform-specific guesses, probed once the homepage fingerprint is known
+CMS_PATHS = {
+    "wordpress": ["feed/", "wp-sitemap.xml", "sitemap_index.xml", "news-sitemap.xml", "post-sitemap.xml"],
+    "drupal": ["rss.xml", "sitemap.xml"],
+    "ghost": ["rss/", "sitemap.xml"],
+    "hugo": ["index.xml", "sitemap.xml"],
+    "blogger": ["feeds/posts/default", "sitemap.xml"],
+    "joomla": ["index.php?format=feed&type=rss", "sitemap.xml"],
+}
+
+# Suffixes tried on nav/category links (e.g. /news -> /news/feed/)
+CATEGORY_SUFFIXES = ["/feed/", "/rss.xml", "/index.xml", ".xml"]
+
+# A feed hit ending in one of these tells us which category suffix this host uses
+COMMON_PATH_SUFFIXES = {"feed": "/feed/", "rss.xml": "/rss.xml", "index.xml": "/index.xml"}
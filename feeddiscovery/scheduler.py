@@ -0,0 +1,173 @@
+# scheduler.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from .metrics import BACKOFFS, INFLIGHT_REQUESTS
+
+# Status codes that mean "slow down" rather than "not a feed"
+BACKOFF_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Retry-After is either delta-seconds or an HTTP-date. Returns seconds or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst` saved up."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    @property
+    def full(self):
+        self._refill()
+        return self.tokens >= self.burst
+
+
+class _HostState:
+    def __init__(self, per_host, rate, burst):
+        self.semaphore = asyncio.Semaphore(per_host)
+        self.bucket = TokenBucket(rate, burst)
+        self.blocked_until = 0.0
+        self.failures = 0
+
+    @property
+    def idle(self):
+        return (
+            not self.semaphore.locked()
+            and self.bucket.full
+            and self.blocked_until <= time.monotonic()
+        )
+
+
+class RequestScheduler:
+    """
+    Politeness scheduler for candidate probing.
+
+    - caps in-flight requests globally and per host
+    - paces each origin with a token bucket (and optionally all traffic)
+    - backs an origin off on 429/503, honouring Retry-After, and retries
+
+    One scheduler can be shared by every discovery in the process so limits
+    hold across concurrent requests to the same publisher.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=64,
+        per_host=6,
+        rate=10.0,
+        burst=10,
+        max_retries=2,
+        base_backoff=1.0,
+        max_backoff=30.0,
+        max_hosts=10000,
+        global_rate=None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_hosts = max_hosts
+        self._global = asyncio.Semaphore(max_concurrency)
+        # Optional requests/second cap across every host
+        self._global_bucket = TokenBucket(global_rate, global_rate) if global_rate else None
+        self._hosts = {}
+
+    def _host(self, url):
+        host = urlparse(url).netloc.lower()
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= self.max_hosts:
+                self._prune()
+            state = self._hosts[host] = _HostState(self.per_host, self.rate, self.burst)
+        return state
+
+    def _prune(self):
+        for host in [h for h, s in self._hosts.items() if s.idle]:
+            del self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """Wait for a host slot, a global slot and a token, in that order."""
+        state = self._host(url)
+        async with state.semaphore:
+            delay = state.blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await state.bucket.acquire()
+            if self._global_bucket is not None:
+                await self._global_bucket.acquire()
+            async with self._global:
+                INFLIGHT_REQUESTS.inc()
+                try:
+                    yield
+                finally:
+                    INFLIGHT_REQUESTS.dec()
+
+    def backoff(self, url, retry_after=None):
+        """Block an origin for Retry-After seconds, or exponentially if absent."""
+        state = self._host(url)
+        state.failures += 1
+        BACKOFFS.inc()
+        if retry_after is None:
+            retry_after = self.base_backoff * (2 ** (state.failures - 1))
+        delay = min(retry_after, self.max_backoff)
+        state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+
+    def _recovered(self, url):
+        self._host(url).failures = 0
+
+    async def submit(self, url, fn, *args):
+        """
+        Runs `fn(*args)` inside a slot for `url`. If the result carries a
+        backoff status_code, the origin is backed off and the call retried.
+        """
+        result = None
+        for attempt in range(self.max_retries + 1):
+            async with self.slot(url):
+                result = await fn(*args)
+            if getattr(result, "status_code", None) not in BACKOFF_STATUSES:
+                self._recovered(url)
+                return result
+            retry_after = getattr(result, "retry_after", None)
+            if retry_after is None and hasattr(result, "headers"):
+                # Plain httpx.Response (homepage, robots.txt)
+                retry_after = parse_retry_after(result.headers.get("Retry-After"))
+            self.backoff(url, retry_after)
+        return result
@@ -0,0 +1,278 @@
+# sources.py
+"""
+Streaming URL sources for FeedValidator.
+
+Every source yields URLs in chunks, so checks can start on the first chunk
+while the rest is still loading and nothing holds the full list in memory.
+"""
+import abc
+import asyncio
+import csv
+import hashlib
+import json
+import math
+import os
+import sqlite3
+
+
+class UrlSource(abc.ABC):
+    """Base class: subclasses implement iter_chunks() yielding lists of URLs."""
+
+    chunk_size = 5000
+
+    @abc.abstractmethod
+    def iter_chunks(self):
+        """Yields lists of URLs, at most `chunk_size` each."""
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+
+class DatabaseSource(UrlSource):
+    """
+    Source URLs for a list of domain names, via the source/domain join.
+
+    The IN list is split into batches of `in_batch` names and rows are read
+    with fetchmany(). Pass a connect() returning a server-side (unbuffered)
+    cursor, e.g. pymysql's SSCursor, so rows stream from the server.
+    """
+
+    QUERY = """
+        SELECT s.url
+        FROM source s
+        INNER JOIN domain d ON s.domain_id = d.id
+        WHERE d.name IN ({placeholders})
+        AND s.is_deleted = 0
+    """
+
+    def __init__(self, domain_names, connect, close=None, in_batch=500, chunk_size=5000, placeholder="%s"):
+        self.domain_names = list(domain_names)
+        self.connect = connect
+        self.close = close
+        self.in_batch = in_batch
+        self.chunk_size = chunk_size
+        self.placeholder = placeholder
+
+    def iter_chunks(self):
+        if not self.domain_names:
+            return
+        conn, cursor = self.connect()
+        try:
+            for start in range(0, len(self.domain_names), self.in_batch):
+                names = self.domain_names[start:start + self.in_batch]
+                query = self.QUERY.format(placeholders=",".join([self.placeholder] * len(names)))
+                cursor.execute(query, tuple(names))
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    yield [row[0] for row in rows]
+        finally:
+            if self.close is not None:
+                self.close(db=conn, cursor=cursor)
+            else:
+                cursor.close()
+                conn.close()
+
+
+class SQLiteSource(DatabaseSource):
+    """Offline stand-in for the MySQL source/domain tables (see create_sqlite_sources)."""
+
+    def __init__(self, path, domain_names, **kwargs):
+        self.path = path
+        kwargs.setdefault("placeholder", "?")
+        super().__init__(domain_names, connect=self._connect, **kwargs)
+
+    def _connect(self):
+        # Chunks are read from worker threads (see stream_urls)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        return conn, conn.cursor()
+
+
+def create_sqlite_sources(path, urls_by_domain):
+    """Builds a local source/domain database: {domain name: [feed urls]}."""
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS domain (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+            CREATE TABLE IF NOT EXISTS source (
+                id INTEGER PRIMARY KEY, domain_id INTEGER NOT NULL REFERENCES domain(id),
+                url TEXT NOT NULL, is_deleted INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        for name, urls in urls_by_domain.items():
+            conn.execute("INSERT OR IGNORE INTO domain (name) VALUES (?)", (name,))
+            domain_id = conn.execute("SELECT id FROM domain WHERE name = ?", (name,)).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO source (domain_id, url) VALUES (?, ?)", ((domain_id, url) for url in urls)
+            )
+    conn.close()
+    return path
+
+
+class CSVSource(UrlSource):
+    def __init__(self, path, column="url", chunk_size=5000):
+        self.path = path
+        self.column = column
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self):
+        with open(self.path, newline="", encoding="utf-8") as fh:
+            chunk = []
+            for row in csv.DictReader(fh):
+                url = (row.get(self.column) or "").strip()
+                if url:
+                    chunk.append(url)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+
+class JSONLSource(UrlSource):
+    """One JSON object per line with a `field` holding the URL (bare strings work too)."""
+
+    def __init__(self, path, field="url", chunk_size=5000):
+        self.path = path
+        self.field = field
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self):
+        with open(self.path, encoding="utf-8") as fh:
+            chunk = []
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                url = record if isinstance(record, str) else record.get(self.field)
+                if url:
+                    chunk.append(url.strip())
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+
+class ExcelSource(UrlSource):
+    """Reads the `column` of the first sheet row by row (openpyxl read-only mode)."""
+
+    def __init__(self, path, column="url", chunk_size=5000):
+        self.path = path
+        self.column = column
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.path, read_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header or self.column not in header:
+                return
+            index = list(header).index(self.column)
+            chunk = []
+            for row in rows:
+                url = row[index] if index < len(row) else None
+                if url:
+                    chunk.append(str(url).strip())
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            workbook.close()
+
+
+class PandasExcelSource(UrlSource):
+    """
+    Fallback for spreadsheets openpyxl can't stream (.xls, .ods, ...): loaded
+    whole with pd.read_excel, as the file input always was, then chunked.
+    """
+
+    def __init__(self, path, column="url", chunk_size=5000):
+        self.path = path
+        self.column = column
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self):
+        import pandas as pd
+
+        data = pd.read_excel(self.path)
+        if self.column not in data.columns:
+            return
+        urls = [str(url).strip() for url in data[self.column].dropna().tolist()]
+        for start in range(0, len(urls), self.chunk_size):
+            yield urls[start:start + self.chunk_size]
+
+
+def source_for_file(path, column="url"):
+    """Picks a reader from the file extension; anything unknown goes to pandas."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return CSVSource(path, column)
+    if ext in (".jsonl", ".ndjson"):
+        return JSONLSource(path, column)
+    if ext in (".xlsx", ".xlsm"):
+        return ExcelSource(path, column)
+    return PandasExcelSource(path, column)
+
+
+class BloomFilter:
+    """
+    Fixed-memory membership filter for dedup: never misses a repeat, and
+    wrongly treats a new URL as seen with probability ~`error_rate`.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        """Adds item; returns True if it was (probably) already present."""
+        present = True
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+
+async def stream_urls(sources, seen=None):
+    """
+    Yields unique URLs from several sources. Each chunk is loaded in a worker
+    thread while the caller keeps checking the previous one. A source that
+    fails (database down, unreadable file) is reported and skipped; the
+    URLs it already produced stay checked and the other sources still run.
+    """
+    seen = seen if seen is not None else BloomFilter()
+    loop = asyncio.get_running_loop()
+    for source in sources:
+        chunks = iter(source.iter_chunks())
+        next_chunk = loop.run_in_executor(None, next, chunks, None)
+        while True:
+            try:
+                chunk = await next_chunk
+            except Exception as e:
+                print(f"{type(source).__name__} error: {e}")
+                break
+            if chunk is None:
+                break
+            # Prefetch the following chunk before handing this one out
+            next_chunk = loop.run_in_executor(None, next, chunks, None)
+            for url in chunk:
+                if not seen.add(url):
+                    yield url
@@ -0,0 +1,63 @@
+# stop_conditions.py
+"""
+Early-termination policies for AsyncFeedDiscovery(stop_when=...).
+
+A stop condition is any callable taking the list of results found so far and
+returning True once discovery has enough to answer.
+"""
+
+# How much a single hit from each strategy says about the domain being "covered"
+SOURCE_CONFIDENCE = {
+    "link_alternate": 1.0,
+    "robots": 1.0,
+    "cms": 0.5,
+    "common_path": 0.5,
+    "nav_discovery": 0.3,
+}
+
+
+def first_n_feeds(n=1):
+    def condition(results):
+        return sum(1 for r in results if r["type"] == "feed") >= n
+    return condition
+
+
+def feed_and_sitemap():
+    def condition(results):
+        types = {r["type"] for r in results}
+        return "feed" in types and "sitemap" in types
+    return condition
+
+
+def confidence_reached(threshold=1.0, weights=SOURCE_CONFIDENCE):
+    """Stops once the summed per-source confidence of the hits reaches `threshold`."""
+    def condition(results):
+        return sum(weights.get(r["source"], 0.3) for r in results) >= threshold
+    return condition
+
+
+def any_of(*conditions):
+    def condition(results):
+        return any(c(results) for c in conditions)
+    return condition
+
+
+def parse_stop_condition(spec):
+    """
+    Builds a condition from a short string, e.g. for query/form parameters:
+    'feeds:3', 'feed+sitemap', 'confidence:1.5'. Several can be joined with ','.
+    """
+    if not spec:
+        return None
+    conditions = []
+    for part in spec.split(","):
+        name, _, arg = part.strip().partition(":")
+        if name == "feeds":
+            conditions.append(first_n_feeds(int(arg or 1)))
+        elif name == "feed+sitemap":
+            conditions.append(feed_and_sitemap())
+        elif name == "confidence":
+            conditions.append(confidence_reached(float(arg or 1.0)))
+        else:
+            raise ValueError(f"Unknown stop condition: {part!r}")
+    return conditions[0] if len(conditions) == 1 else any_of(*conditions)
@@ -1,58 +1,155 @@
 import httpx
 from lxml import etree
-import io
+from typing import NamedTuple, Optional
+from urllib.parse import urljoin
+from .metrics import record_error
+from .scheduler import parse_retry_after
+from .sitemaps import MAX_INDEX_BYTES, IndexCollector, gunzip_stream
 
-async def validate_feed(client: httpx.AsyncClient, url: str) -> bool:
+# Root tags we accept, split by what the discovery result calls them
+FEED_KINDS = ("rss", "atom", "rdf")
+SITEMAP_KINDS = ("sitemapindex", "urlset")
+
+# Bytes we are willing to read before giving up on finding a root element
+SNIFF_BYTES = 16 * 1024
+
+# Redirect hops followed per candidate (httpx's own default is 20)
+MAX_REDIRECTS = 5
+
+# Root tag (namespace stripped, lowercased) -> verdict kind
+ROOT_KINDS = {
+    "rss": "rss",
+    "feed": "atom",
+    "rdf": "rdf",
+    "sitemapindex": "sitemapindex",
+    "urlset": "urlset",
+}
+
+
+class Verdict(NamedTuple):
+    """Outcome of classifying a single candidate URL."""
+    kind: Optional[str] = None          # one of FEED_KINDS / SITEMAP_KINDS, or None
+    status_code: int = 0
+    final_url: Optional[str] = None
+    retry_after: Optional[float] = None   # seconds, from a 429/503 Retry-After
+    namespaces: tuple = ()                # declared on the root (news/video sitemaps)
+    error: Optional[str] = None           # exception type when the fetch itself failed
+    stopped: Optional[str] = None         # reason on_redirect gave for not following a hop
+    children: tuple = ()                  # SitemapEntry per child, when a sitemapindex was expanded
+
+    @property
+    def category(self):
+        if self.kind in FEED_KINDS:
+            return "feed"
+        if self.kind in SITEMAP_KINDS:
+            return "sitemap"
+        return None
+
+
+def root_kind(tag) -> Optional[str]:
+    """Map an lxml root tag to a verdict kind."""
+    if not isinstance(tag, str):
+        return None
+    # Handle Namespaces: Strip the namespace from the tag for easy checking
+    if '}' in tag:
+        tag = tag.split('}', 1)[1]
+    return ROOT_KINDS.get(tag.lower())
+
+
+def _sniff_parser():
+    # The first 'start' event is the root element; 'end' events are only
+    # read when a sitemap index is being expanded
+    return etree.XMLPullParser(
+        events=("start", "end"), recover=True, remove_comments=True,
+        no_network=True, resolve_entities=False,
+    )
+
+
+async def sniff_stream(chunks, limit: int = SNIFF_BYTES, max_children: int = 0,
+                       index_limit: int = MAX_INDEX_BYTES):
+    """
+    Feed an async byte stream into an incremental parser and return
+    (verdict kind, root namespaces, children) as soon as the root element is
+    seen. Stops after `limit` bytes.
+
+    With `max_children`, a <sitemapindex> is read on (up to `index_limit`
+    bytes) and its newest child entries returned, so the index is never
+    downloaded twice.
+    """
+    parser = _sniff_parser()
+    read = 0
+    started = False
+    index = None
+    namespaces = ()
+    async for chunk in chunks:
+        if not started:
+            # XML declarations must be at the very start, so drop leading whitespace
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            if chunk[:1] != b"<" and not chunk.startswith(b"\xef\xbb\xbf"):
+                return None, (), ()
+            started = True
+        read += len(chunk)
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if index is None:
+                kind = root_kind(element.tag)
+                namespaces = tuple(v for v in element.nsmap.values() if v)
+                if kind != "sitemapindex" or not max_children:
+                    return kind, namespaces, ()
+                index = IndexCollector(max_children)
+            elif event == "end":
+                index.add(element)
+        if read >= (limit if index is None else index_limit):
+            break
+    if index is not None:
+        return "sitemapindex", namespaces, tuple(index.entries())
+    return None, (), ()
+
+
+async def classify_url(client: httpx.AsyncClient, url: str, sniff_bytes: int = SNIFF_BYTES,
+                       on_redirect=None, max_redirects: int = MAX_REDIRECTS, max_children: int = 0) -> Verdict:
+    """
+    Fetch a candidate once and classify it as a feed, a sitemap or neither.
+    Only the first few KB are read; the connection is closed as soon as the
+    root element is known, so memory stays bounded whatever the document size.
+    Gzipped bodies (.xml.gz) are decompressed on the fly.
+
+    Redirects are followed here, one hop at a time. `on_redirect(next_url)`
+    may return a reason string (e.g. "duplicate") to stop before fetching
+    the hop; the verdict then carries it in `stopped`.
+
+    With `max_children`, a sitemap index is read in full and up to that many
+    children (newest first) returned in `children`.
+    """
     try:
-        # Increase limit for large feed files
-        r = await client.get(url, follow_redirects=True, timeout=10.0)
-        
-        if r.status_code != 200:
-            return False
-
-        content = r.content.strip()
-        if not content:
-            return False
-
-        # FIX: Don't rely strictly on headers. Some feeds return 'text/plain'
-        # Check first 500 bytes for common XML feed signatures
-        snippet = content[:500].lower()
-        if not any(tag in snippet for tag in [b"<rss", b"<feed", b"<channel", b"xmlns="]):
-            return False
-
-        # Use a parser that recovers from minor syntax errors
-        parser = etree.XMLParser(recover=True, remove_comments=True)
-        root = etree.fromstring(content, parser=parser)
-        
-        # Handle Namespaces: Strip the namespace from the tag for easy checking
-        tag = root.tag
-        if '}' in tag:
-            tag = tag.split('}', 1)[1]
-            
-        return tag.lower() in ["rss", "feed", "rdf"]
-    except Exception:
-        return False
+        for _hop in range(max_redirects + 1):
+            async with client.stream("GET", url, follow_redirects=False, timeout=10.0) as r:
+                if r.is_redirect:
+                    url = urljoin(url, r.headers["Location"])
+                    stopped = on_redirect(url) if on_redirect is not None else None
+                    if stopped:
+                        return Verdict(status_code=r.status_code, final_url=url, stopped=stopped)
+                    continue
+                if r.status_code != 200:
+                    return Verdict(
+                        status_code=r.status_code, final_url=url,
+                        retry_after=parse_retry_after(r.headers.get("Retry-After")),
+                    )
+                kind, namespaces, children = await sniff_stream(
+                    gunzip_stream(r.aiter_bytes()), sniff_bytes, max_children,
+                )
+                return Verdict(kind, r.status_code, url, namespaces=namespaces, children=children)
+        raise httpx.TooManyRedirects(f"More than {max_redirects} redirects", request=r.request)
+    except Exception as e:
+        record_error("classify", e, url)
+        return Verdict(error=type(e).__name__)
+
+
+async def validate_feed(client: httpx.AsyncClient, url: str) -> bool:
+    return (await classify_url(client, url)).category == "feed"
+
 
 async def validate_sitemap(client: httpx.AsyncClient, url: str) -> bool:
-    try:
-        r = await client.get(url, follow_redirects=True, timeout=10.0)
-        if r.status_code != 200:
-            return False
-            
-        content = r.content.strip()
-        
-        # Sitemaps can be huge; use iterparse or simple checks for snippet
-        snippet = content[:500].lower()
-        if b"sitemap" not in snippet and b"urlset" not in snippet:
-            return False
-
-        parser = etree.XMLParser(recover=True)
-        root = etree.fromstring(content, parser=parser)
-        
-        tag = root.tag
-        if '}' in tag:
-            tag = tag.split('}', 1)[1]
-            
-        return tag.lower() in ["sitemapindex", "urlset"]
-    except Exception:
-        return False
\ No newline at end of file
+    return (await classify_url(client, url)).category == "sitemap"
@@ -1,14 +1,86 @@
 # main.py
+import json
 import os
-from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from feeddiscovery.discovery_async import AsyncFeedDiscovery
+from starlette.concurrency import run_in_threadpool
+from feeddiscovery.batch import discover_many, read_domains
+from feeddiscovery.cache import DiscoveryCache, MemoryBackend, SQLiteBackend
+from feeddiscovery.http_client import build_client
+from feeddiscovery.metrics import REGISTRY, DiscoveryTrace, LoopLagMonitor
+from feeddiscovery.parsing import ParseExecutor
+from feeddiscovery.path_stats import PathStats
+from feeddiscovery.scheduler import RequestScheduler
+from feeddiscovery.stop_conditions import parse_stop_condition
+
+
+# -------------------------------
+# Shared HTTP client (app lifetime)
+# -------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client for every request: keeps TLS sessions, DNS answers
+    # and keep-alive connections warm across /discover calls
+    app.state.http_client = build_client(
+        timeout=float(os.getenv("FEED_HTTP_TIMEOUT", "15")),
+        max_connections=int(os.getenv("FEED_HTTP_MAX_CONNECTIONS", "200")),
+        max_keepalive_connections=int(os.getenv("FEED_HTTP_MAX_KEEPALIVE", "50")),
+        http2=os.getenv("FEED_HTTP2", "0") == "1",
+        dns_cache_ttl=float(os.getenv("FEED_DNS_CACHE_TTL", "300")),
+    )
+    # Shared politeness limits, so concurrent requests for the same publisher
+    # don't add up to a burst against one origin
+    app.state.scheduler = RequestScheduler(
+        max_concurrency=int(os.getenv("FEED_MAX_CONCURRENCY", "64")),
+        per_host=int(os.getenv("FEED_PER_HOST_CONCURRENCY", "6")),
+        rate=float(os.getenv("FEED_PER_HOST_RATE", "10")),
+    )
+    # Domain results + known-dead URLs; set FEED_CACHE_PATH to persist to SQLite
+    cache_path = os.getenv("FEED_CACHE_PATH")
+    app.state.cache = DiscoveryCache(
+        backend=SQLiteBackend(cache_path) if cache_path else MemoryBackend(),
+        ttl=float(os.getenv("FEED_CACHE_TTL", str(6 * 3600))),
+        stale_ttl=float(os.getenv("FEED_CACHE_STALE_TTL", str(24 * 3600))),
+    )
+    # Large homepages parse in a worker pool instead of stalling the loop:
+    # FEED_PARSE_EXECUTOR=thread|process|inline, FEED_PARSE_THRESHOLD in bytes
+    workers = os.getenv("FEED_PARSE_WORKERS")
+    app.state.parse_executor = ParseExecutor(
+        kind=os.getenv("FEED_PARSE_EXECUTOR", "thread"),
+        max_workers=int(workers) if workers else None,
+        threshold=int(os.getenv("FEED_PARSE_THRESHOLD", str(64 * 1024))),
+    )
+    # Per-path hit rates across runs; set FEED_PATH_STATS to a SQLite path to
+    # order guessed paths by yield and skip the ones that never hit
+    stats_path = os.getenv("FEED_PATH_STATS")
+    app.state.path_stats = PathStats(
+        stats_path,
+        threshold=float(os.getenv("FEED_PATH_STATS_THRESHOLD", "0.01")),
+        explore=float(os.getenv("FEED_PATH_STATS_EXPLORE", "0.1")),
+    ) if stats_path else None
+    app.state.loop_lag = LoopLagMonitor()
+    app.state.loop_lag.start()
+    try:
+        yield
+    finally:
+        await app.state.loop_lag.stop()
+        app.state.parse_executor.shutdown()
+        if app.state.path_stats is not None:
+            app.state.path_stats.close()
+        app.state.cache.close()
+        await app.state.http_client.aclose()
+
 
 app = FastAPI(
     title="Feed & Sitemap Discovery",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 templates = Jinja2Templates(directory="templates")
 
@@ -24,7 +96,152 @@ async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request, "results": None})
 
 
+@app.get("/stats/loop")
+async def loop_stats(request: Request):
+    """Event-loop lag and how many parses ran inline vs in the executor."""
+    state = request.app.state
+    executor = state.parse_executor
+    return {
+        "loop_lag": state.loop_lag.snapshot(),
+        "parse": {"kind": executor.kind, "threshold": executor.threshold, **executor.stats},
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: request phases, strategy hit rates, errors, in-flight gauges, loop lag."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def _stop_condition(stop):
+    try:
+        return parse_stop_condition(stop)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 @app.post("/discover")
-async def discover(domain: str = Form(...)):
-    results = await AsyncFeedDiscovery(domain).discover()
-    return {"results": results}
+async def discover(
+    request: Request,
+    domain: str = Form(...),
+    deadline: Optional[float] = Form(None),
+    stop: Optional[str] = Form(None),
+    trace: bool = Form(False),
+):
+    """
+    `deadline` is a time budget in seconds; `stop` ends early once e.g.
+    'feeds:1' or 'feed+sitemap' is satisfied. `complete` is False when
+    either one cut the run short, or when the homepage/robots.txt or every
+    probe failed. `trace=1` runs live (bypassing the cache) and adds a
+    per-request/per-strategy `trace` to the response.
+    """
+    run_trace = DiscoveryTrace() if trace else None
+    results, complete = await request.app.state.cache.discover(
+        domain,
+        client=request.app.state.http_client,
+        scheduler=request.app.state.scheduler,
+        parse_executor=request.app.state.parse_executor,
+        path_stats=request.app.state.path_stats,
+        deadline=deadline,
+        stop_when=_stop_condition(stop),
+        trace=run_trace,
+    )
+    if run_trace is not None:
+        return {"results": results, "complete": complete, "trace": run_trace.as_dict()}
+    return {"results": results, "complete": complete}
+
+
+@app.get("/discover/stream")
+async def discover_stream(
+    request: Request, domain: str, deadline: Optional[float] = None, stop: Optional[str] = None, trace: bool = False,
+):
+    """
+    Server-sent events: one `result` event per feed/sitemap as soon as it is
+    confirmed. With `trace=1` a `trace` event precedes `done`.
+    """
+    state = request.app.state
+    run_trace = DiscoveryTrace() if trace else None
+    results = state.cache.iter_discover(
+        domain,
+        client=state.http_client,
+        scheduler=state.scheduler,
+        parse_executor=state.parse_executor,
+        path_stats=state.path_stats,
+        deadline=deadline,
+        stop_when=_stop_condition(stop),
+        trace=run_trace,
+    )
+    return _sse(results, "result", trailer=run_trace.as_dict if run_trace is not None else None)
+
+
+# -------------------------------
+# Batch discovery (streamed)
+# -------------------------------
+async def _spool_upload(upload: UploadFile):
+    # Starlette may close the upload once the endpoint returns, before the
+    # streamed response has consumed it, so copy it to a temp file first
+    tmp = tempfile.NamedTemporaryFile("wb", suffix=".txt", delete=False)
+    try:
+        await run_in_threadpool(shutil.copyfileobj, upload.file, tmp)
+    finally:
+        tmp.close()
+    return tmp.name
+
+
+def _file_domains(path):
+    # Lazily read the spooled file so a 50k-line batch is never held in memory
+    try:
+        yield from read_domains(path)
+    finally:
+        os.unlink(path)
+
+
+def _ndjson(records):
+    async def body():
+        async for record in records:
+            yield json.dumps(record) + "\n"
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+def _sse(records, event, trailer=None):
+    # trailer: optional callable whose dict is sent as a `trace` event before `done`
+    async def body():
+        async for record in records:
+            yield f"event: {event}\ndata: {json.dumps(record)}\n\n"
+        if trailer is not None:
+            yield f"event: trace\ndata: {json.dumps(trailer())}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/discover/batch")
+async def discover_batch(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    domains: Optional[str] = Form(None),
+    format: str = Form("ndjson"),
+    concurrency: int = Form(50),
+):
+    """
+    Discovers many domains at once. Send a file (one domain per line) or a
+    newline-separated `domains` field. Each domain's record is streamed as
+    soon as it completes, as NDJSON (default) or server-sent events.
+    """
+    if file is not None:
+        source = _file_domains(await _spool_upload(file))
+    else:
+        source = (d.strip() for d in (domains or "").splitlines() if d.strip())
+
+    state = request.app.state
+    records = discover_many(
+        source,
+        concurrency=max(1, min(concurrency, int(os.getenv("FEED_BATCH_MAX_CONCURRENCY", "200")))),
+        cache=state.cache,
+        client=state.http_client,
+        scheduler=state.scheduler,
+        parse_executor=state.parse_executor,
+        path_stats=state.path_stats,
+    )
+    if format == "sse":
+        return _sse(records, "domain")
+    return _ndjson(records)